@@ -1,6 +1,13 @@
-from app import create_app
+# The chart pool's spawned workers execute this file again as __mp_main__.
+# They only need chart_renderers, so the app is built in real processes only.
+if __name__ != '__mp_main__':
+    from app import create_app, init_schema
+    from app.utils.prewarm import quiz_prewarmer
 
-app = create_app()
+    app = create_app()
 
 if __name__ == '__main__':
+    init_schema(app)
+    if app.config['QUIZ_PREWARM_ENABLED']:
+        quiz_prewarmer.start()
     app.run()
@@ -1,9 +1,7 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quiz_master.db'
-db = SQLAlchemy(app)
+# Bound to an application, and so to a database, by create_app()
+db = SQLAlchemy()
 
 # User model
 class User(db.Model):
@@ -74,7 +72,7 @@ class Chapter(db.Model):
         quizzes (relationship): One-to-many relationship with Quiz model
     """
     id = db.Column(db.Integer, primary_key=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     quizzes = db.relationship('Quiz', backref='chapter', lazy=True, cascade='all, delete-orphan')
@@ -95,7 +93,7 @@ class Quiz(db.Model):
         scores (relationship): One-to-many relationship with Score model
     """
     id = db.Column(db.Integer, primary_key=True)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), nullable=False, index=True)
     date_of_quiz = db.Column(db.DateTime, nullable=False)
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
@@ -119,7 +117,7 @@ class Question(db.Model):
         correct_option (int): Integer indicating the correct option (1-4)
     """
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
     question_statement = db.Column(db.Text, nullable=False)
     option1 = db.Column(db.String(255), nullable=False)
     option2 = db.Column(db.String(255), nullable=False)
@@ -138,14 +136,18 @@ class Score(db.Model):
         user_id (int): Foreign key referencing User model
         total_score (int): Score achieved by the user
         max_score (int): Maximum possible score for the quiz
+
+    Indexes:
+        ix_score_user_id_quiz_id: Unique (user_id, quiz_id), one attempt per quiz;
+            also serves lookups by user_id alone
+        ix_score_quiz_id: Lookups of all scores for a quiz
     """
+    __table_args__ = (
+        db.Index('ix_score_user_id_quiz_id', 'user_id', 'quiz_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     total_score = db.Column(db.Integer, nullable=False)
     max_score = db.Column(db.Integer, nullable=False)
-
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        print("Database and tables created successfully!")
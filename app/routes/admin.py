@@ -2,7 +2,12 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from app.models.database import db, Subject, Chapter, Quiz, Question, User
 from datetime import datetime
 from app.utils.helpers import admin_required, search_users, search_subjects, search_chapters, search_quizzes, search_questions
-from app.utils.chart_utils import generate_admin_quiz_stats, generate_admin_user_stats
+from app.utils.chart_utils import generate_admin_quiz_stats, generate_admin_user_stats, chart_response
+from app.utils.queries import get_user_activity_page, USER_SORT_COLUMNS, ACTIVITY_SORT_KEYS
+
+# Page size bounds for the user management listing
+USERS_PER_PAGE = 50
+MAX_USERS_PER_PAGE = 200
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -12,21 +17,31 @@ def dashboard():
     """
     Render the admin dashboard page.
     
-    Displays an overview of all subjects and users in the system,
-    along with user statistics visualization.
+    Displays an overview of all subjects and the most recently registered
+    users with their activity. The user statistics chart is served
+    separately by user_stats_chart.
     
     Returns:
-        rendered template: The admin dashboard page with subjects, users and stats
+        rendered template: The admin dashboard page with subjects and recent users
     """
     subjects = Subject.query.all()
-    users = User.query.all()
-    
-    user_stats_chart = generate_admin_user_stats(users)
+    recent_users, _ = get_user_activity_page(per_page=5, sort='id', order='desc')
     
     return render_template('admin/dashboard.html', 
                          subjects=subjects, 
-                         users=users,
-                         user_stats_chart=user_stats_chart)
+                         recent_users=recent_users)
+
+@admin.route('/charts/user-stats.png')
+@admin_required
+def user_stats_chart():
+    """
+    Serve the user statistics chart shown on the dashboard.
+    
+    Returns:
+        Response: PNG image with ETag and Cache-Control headers,
+                  or 304 Not Modified on a matching conditional GET
+    """
+    return chart_response(generate_admin_user_stats())
 
 @admin.route('/subjects', methods=['GET'])
 @admin_required
@@ -240,24 +255,39 @@ def manage_quizzes(chapter_id):
     """
     Display the quiz management page for a specific chapter.
     
-    Shows all quizzes for the chapter along with quiz statistics visualization.
+    Shows all quizzes for the chapter. The quiz statistics chart is served
+    separately by quiz_stats_chart.
     
     Args:
         chapter_id (int): The ID of the chapter whose quizzes to manage
         
     Returns:
         rendered template: The quiz management page with list of quizzes
-                         and statistics for the specified chapter
+                         for the specified chapter
     """
     chapter = Chapter.query.get_or_404(chapter_id)
     quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
     
-    quiz_stats_chart = generate_admin_quiz_stats(quizzes)
-    
     return render_template('admin/quizzes.html', 
                          chapter=chapter, 
-                         quizzes=quizzes,
-                         quiz_stats_chart=quiz_stats_chart)
+                         quizzes=quizzes)
+
+@admin.route('/chapters/<int:chapter_id>/charts/quiz-stats.png')
+@admin_required
+def quiz_stats_chart(chapter_id):
+    """
+    Serve the quiz statistics chart for a specific chapter.
+    
+    Args:
+        chapter_id (int): The ID of the chapter whose quizzes to chart
+        
+    Returns:
+        Response: PNG image with ETag and Cache-Control headers,
+                  or 304 Not Modified on a matching conditional GET
+    """
+    Chapter.query.get_or_404(chapter_id)
+    quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
+    return chart_response(generate_admin_quiz_stats(quizzes))
 
 @admin.route('/chapters/<int:chapter_id>/quizzes/add', methods=['GET', 'POST'])
 @admin_required
@@ -502,13 +532,36 @@ def manage_users():
     """
     Display the user management page.
     
-    Lists all users in the system for administrative operations.
+    Lists users one page at a time with their quiz count and average score,
+    sorted on the server.
+    
+    Query Parameters:
+        page (int): 1-based page number (default 1)
+        per_page (int): Users per page (default USERS_PER_PAGE, capped at MAX_USERS_PER_PAGE)
+        sort (str): 'username', 'full_name', 'email', 'quiz_count' or 'average_score'
+        order (str): 'asc' or 'desc'
     
     Returns:
-        rendered template: The user management page with list of all users
+        rendered template: The user management page with one page of users
     """
-    users = User.query.all()
-    return render_template('admin/users.html', users=users)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', USERS_PER_PAGE, type=int), 1), MAX_USERS_PER_PAGE)
+    sort = request.args.get('sort', 'username')
+    if sort not in USER_SORT_COLUMNS and sort not in ACTIVITY_SORT_KEYS:
+        sort = 'username'
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    
+    users, total = get_user_activity_page(page, per_page, sort, order)
+    pages = max((total + per_page - 1) // per_page, 1)
+    
+    return render_template('admin/users.html', 
+                         users=users,
+                         total=total,
+                         page=page,
+                         pages=pages,
+                         per_page=per_page,
+                         sort=sort,
+                         order=order)
 
 @admin.route('/users/<int:id>')
 @admin_required
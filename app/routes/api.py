@@ -1,26 +1,174 @@
-from flask import Blueprint, jsonify, request
+import json
+import mimetypes
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from sqlalchemy import insert
 from app.models.database import db, Subject, Chapter, Quiz, Question, Score, User
+from app.utils.bulk_import import (ImportFormatError, iter_records, import_questions, import_quizzes,
+                                   QUESTION_FIELDS, JSON_MIMETYPE, NDJSON_MIMETYPE)
 from datetime import datetime
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
+# Page size used when only 'after' is given, and the hard upper bound for 'limit'
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched from the database cursor at a time when streaming NDJSON
+STREAM_BATCH_SIZE = 1000
+
+def wants_ndjson():
+    """Check whether the client asked for an NDJSON stream.
+
+    Either ?format=ndjson or an Accept header preferring application/x-ndjson
+    over application/json selects the streaming mode.
+    """
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match([JSON_MIMETYPE, NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+def ndjson_response(query, model, serialize):
+    """Stream the rows of a query as newline-delimited JSON.
+
+    Rows are pulled from the cursor in batches of STREAM_BATCH_SIZE with
+    yield_per and written out one JSON object per line as they arrive, so
+    memory stays constant and the first line is sent before the query
+    has been fully read.
+
+    Args:
+        query: The filtered query to stream.
+        model: The model whose primary key orders the stream.
+        serialize (callable): Converts one row to a dict.
+
+    Returns:
+        Response: A streaming application/x-ndjson response.
+    """
+    rows = query.order_by(model.id).yield_per(STREAM_BATCH_SIZE)
+
+    def generate():
+        for row in rows:
+            yield json.dumps(serialize(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def uploaded_document():
+    """Return (binary stream, mimetype) of an import: a multipart field named 'file' or the raw body.
+
+    The mimetype of an uploaded file is guessed from its name when the client
+    sent a generic one.
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        return request.stream, request.mimetype
+    mimetype = upload.mimetype
+    if mimetype in ('', 'application/octet-stream'):
+        mimetype = mimetypes.guess_type(upload.filename or '')[0] or mimetype
+    return upload.stream, mimetype
+
+def paginated_response(query, model, serialize):
+    """Serialize the rows of a list query, keyset-paginated on request.
+
+    Pagination is opt-in: without 'limit' or 'after' in the query string the
+    full list is returned as before. Otherwise rows are ordered by primary key
+    and only those with an id greater than 'after' are fetched, so every page
+    costs the same regardless of its position in the table.
+
+    Query Parameters:
+        limit (int, optional): Page size, capped at MAX_PAGE_SIZE.
+        after (int, optional): Cursor returned as 'next_cursor' by the previous page.
+
+    Args:
+        query: The filtered query to paginate.
+        model: The model whose primary key is the cursor.
+        serialize (callable): Converts one row to a dict.
+
+    Returns:
+        JSON: Either a plain list, or a page.
+        Format: {'items': [...], 'next_cursor': int or None}
+
+    Raises:
+        400: If limit or after is not a valid integer.
+    """
+    if 'limit' not in request.args and 'after' not in request.args:
+        return jsonify([serialize(row) for row in query.all()])
+
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after', type=int)
+    if 'limit' not in request.args:
+        limit = DEFAULT_PAGE_SIZE
+    if limit is None or limit <= 0:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    if 'after' in request.args and after is None:
+        return jsonify({'error': 'after must be an integer'}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    if after is not None:
+        query = query.filter(model.id > after)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+
+    return jsonify({
+        'items': [serialize(row) for row in rows],
+        'next_cursor': next_cursor
+    })
+
+def serialize_subject(subject):
+    """Convert a subject to its JSON representation."""
+    return {
+        'id': subject.id,
+        'name': subject.name,
+        'description': subject.description
+    }
+
+def serialize_chapter(chapter):
+    """Convert a chapter to its JSON representation."""
+    return {
+        'id': chapter.id,
+        'subject_id': chapter.subject_id,
+        'name': chapter.name,
+        'description': chapter.description
+    }
+
+def serialize_quiz(quiz):
+    """Convert a quiz, without its questions, to its JSON representation."""
+    return {
+        'id': quiz.id,
+        'chapter_id': quiz.chapter_id,
+        'date_of_quiz': quiz.date_of_quiz.isoformat() if quiz.date_of_quiz else None,
+        'start_time': quiz.start_time.isoformat() if quiz.start_time else None,
+        'end_time': quiz.end_time.isoformat() if quiz.end_time else None,
+        'time_duration': quiz.time_duration
+    }
+
+def serialize_score(score):
+    """Convert a score to its JSON representation with the calculated percentage."""
+    return {
+        'id': score.id,
+        'user_id': score.user_id,
+        'quiz_id': score.quiz_id,
+        'total_score': score.total_score,
+        'max_score': score.max_score,
+        'percentage': (score.total_score / score.max_score * 100) if score.max_score > 0 else 0
+    }
+
 @api.route('/subjects', methods=['GET'])
 def get_subjects():
     """Get all subjects.
     
+    Query Parameters:
+        limit (int, optional): Page size for keyset pagination.
+        after (int, optional): Return subjects after this cursor.
+    
     Returns:
-        JSON: A list of all subjects with their id, name, and description.
+        JSON: A list of all subjects with their id, name, and description,
+        or a page of them when limit/after is given (see paginated_response).
         Format: [{'id': int, 'name': str, 'description': str}, ...]
     """
-    subjects = Subject.query.all()
-    result = []
-    for subject in subjects:
-        result.append({
-            'id': subject.id,
-            'name': subject.name,
-            'description': subject.description
-        })
-    return jsonify(result)
+    return paginated_response(Subject.query, Subject, serialize_subject)
 
 @api.route('/subjects/<int:subject_id>', methods=['GET'])
 def get_subject(subject_id):
@@ -154,27 +302,21 @@ def get_chapters():
     
     Query Parameters:
         subject_id (int, optional): Filter chapters by subject ID.
+        limit (int, optional): Page size for keyset pagination.
+        after (int, optional): Return chapters after this cursor.
     
     Returns:
-        JSON: List of chapters with their details.
+        JSON: List of chapters with their details, or a page of them
+        when limit/after is given (see paginated_response).
         Format: [{'id': int, 'subject_id': int, 'name': str, 'description': str}, ...]
     """
     subject_id = request.args.get('subject_id', type=int)
     
+    query = Chapter.query
     if subject_id:
-        chapters = Chapter.query.filter_by(subject_id=subject_id).all()
-    else:
-        chapters = Chapter.query.all()
+        query = query.filter_by(subject_id=subject_id)
     
-    result = []
-    for chapter in chapters:
-        result.append({
-            'id': chapter.id,
-            'subject_id': chapter.subject_id,
-            'name': chapter.name,
-            'description': chapter.description
-        })
-    return jsonify(result)
+    return paginated_response(query, Chapter, serialize_chapter)
 
 @api.route('/chapters/<int:chapter_id>', methods=['GET'])
 def get_chapter(chapter_id):
@@ -318,15 +460,78 @@ def delete_chapter(chapter_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@api.route('/chapters/<int:chapter_id>/quizzes/import', methods=['POST'])
+def import_chapter_quizzes(chapter_id):
+    """Bulk import quizzes with their questions into a chapter.
+    
+    The body is a JSON array or NDJSON (one quiz per line), sent as the
+    request body with its Content-Type or as a multipart file field named
+    'file'. A quiz with invalid fields is skipped with its questions; an
+    invalid question is skipped on its own.
+    
+    Request Body:
+        [{
+            'date_of_quiz': str (required, ISO format),
+            'start_time': str (required, format: HH:MM:SS),
+            'end_time': str (required, format: HH:MM:SS),
+            'time_duration': int (required, minutes),
+            'questions': [{ # optional
+                'question_statement': str,
+                'option1': str,
+                'option2': str,
+                'option3': str,
+                'option4': str,
+                'correct_option': int (1-4)
+            }, ...]
+        }, ...]
+    
+    Returns:
+        JSON: Import report.
+        Format: {
+            'quizzes_inserted': int,
+            'questions_inserted': int,
+            'rejected': int (quizzes and questions),
+            'errors': [{'row': int, 'question': int (if a question), 'errors': [str]}, ...],
+            'errors_truncated': bool
+        }
+        
+    Raises:
+        400: If the document cannot be read or has an unsupported type.
+        404: If chapter_id does not exist.
+    """
+    if db.session.get(Chapter, chapter_id) is None:
+        return jsonify({'error': 'Chapter not found'}), 404
+    
+    try:
+        stream, mimetype = uploaded_document()
+        report, questions_inserted = import_quizzes(
+            chapter_id, iter_records(stream, mimetype, formats=(JSON_MIMETYPE, NDJSON_MIMETYPE)))
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    result = report.as_dict()
+    return jsonify({
+        'quizzes_inserted': result.pop('inserted'),
+        'questions_inserted': questions_inserted,
+        **result
+    }), 200
+
 @api.route('/quizzes', methods=['GET'])
 def get_quizzes():
     """Get all quizzes or quizzes for a specific chapter.
     
     Query Parameters:
         chapter_id (int, optional): Filter quizzes by chapter ID.
+        limit (int, optional): Page size for keyset pagination.
+        after (int, optional): Return quizzes after this cursor.
+        format (str, optional): 'ndjson' to stream one quiz per line
+            (also selected by Accept: application/x-ndjson).
     
     Returns:
-        JSON: List of quizzes with their details.
+        JSON: List of quizzes with their details, or a page of them
+        when limit/after is given (see paginated_response), or an NDJSON
+        stream of the same objects.
         Format: [{
             'id': int,
             'chapter_id': int,
@@ -338,22 +543,13 @@ def get_quizzes():
     """
     chapter_id = request.args.get('chapter_id', type=int)
     
+    query = Quiz.query
     if chapter_id:
-        quizzes = Quiz.query.filter_by(chapter_id=chapter_id).all()
-    else:
-        quizzes = Quiz.query.all()
+        query = query.filter_by(chapter_id=chapter_id)
     
-    result = []
-    for quiz in quizzes:
-        result.append({
-            'id': quiz.id,
-            'chapter_id': quiz.chapter_id,
-            'date_of_quiz': quiz.date_of_quiz.isoformat() if quiz.date_of_quiz else None,
-            'start_time': quiz.start_time.isoformat() if quiz.start_time else None,
-            'end_time': quiz.end_time.isoformat() if quiz.end_time else None,
-            'time_duration': quiz.time_duration
-        })
-    return jsonify(result)
+    if wants_ndjson():
+        return ndjson_response(query, Quiz, serialize_quiz)
+    return paginated_response(query, Quiz, serialize_quiz)
 
 @api.route('/quizzes/<int:quiz_id>', methods=['GET'])
 def get_quiz(quiz_id):
@@ -479,23 +675,19 @@ def create_quiz():
         )
         
         db.session.add(quiz)
-        db.session.commit()
+        db.session.flush()
         
         if 'questions' in data and isinstance(data['questions'], list):
-            for q_data in data['questions']:
-                if all(key in q_data for key in ['question_statement', 'option1', 'option2', 'option3', 'option4', 'correct_option']):
-                    question = Question(
-                        quiz_id=quiz.id,
-                        question_statement=q_data['question_statement'],
-                        option1=q_data['option1'],
-                        option2=q_data['option2'],
-                        option3=q_data['option3'],
-                        option4=q_data['option4'],
-                        correct_option=q_data['correct_option']
-                    )
-                    db.session.add(question)
-            
-            db.session.commit()
+            question_rows = [
+                {'quiz_id': quiz.id, **{key: q_data[key] for key in QUESTION_FIELDS}}
+                for q_data in data['questions']
+                if all(key in q_data for key in QUESTION_FIELDS)
+            ]
+            if question_rows:
+                # One executemany INSERT in the quiz's transaction
+                db.session.execute(insert(Question), question_rows)
+        
+        db.session.commit()
         
         return jsonify({
             'id': quiz.id,
@@ -512,6 +704,40 @@ def create_quiz():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@api.route('/quizzes/<int:quiz_id>/questions/import', methods=['POST'])
+def import_quiz_questions(quiz_id):
+    """Bulk import questions into a quiz.
+    
+    The body is a JSON array, NDJSON (one object per line) or CSV with a
+    header row, sent as the request body with its Content-Type or as a
+    multipart file field named 'file'. Each record has the fields
+    question_statement, option1, option2, option3, option4 and
+    correct_option (1-4). Invalid rows are skipped and reported; valid rows
+    are inserted in chunked transactions.
+    
+    Returns:
+        JSON: Import report.
+        Format: {
+            'inserted': int,
+            'rejected': int,
+            'errors': [{'row': int (from 1), 'errors': [str]}, ...],
+            'errors_truncated': bool
+        }
+        
+    Raises:
+        400: If the document cannot be read or has an unsupported type.
+        404: If quiz_id does not exist.
+    """
+    if db.session.get(Quiz, quiz_id) is None:
+        return jsonify({'error': 'Quiz not found'}), 404
+    
+    try:
+        report = import_questions(quiz_id, iter_records(*uploaded_document()))
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report.as_dict()), 200
+
 @api.route('/quizzes/<int:quiz_id>', methods=['PUT'])
 def update_quiz(quiz_id):
     """Update an existing quiz.
@@ -621,9 +847,15 @@ def get_scores():
     Query Parameters:
         user_id (int, optional): Filter scores by user ID.
         quiz_id (int, optional): Filter scores by quiz ID.
+        limit (int, optional): Page size for keyset pagination.
+        after (int, optional): Return scores after this cursor.
+        format (str, optional): 'ndjson' to stream one score per line
+            (also selected by Accept: application/x-ndjson).
     
     Returns:
-        JSON: List of scores with calculated percentages.
+        JSON: List of scores with calculated percentages, or a page of them
+        when limit/after is given (see paginated_response), or an NDJSON
+        stream of the same objects.
         Format: [{
             'id': int,
             'user_id': int,
@@ -644,20 +876,9 @@ def get_scores():
     if quiz_id:
         query = query.filter_by(quiz_id=quiz_id)
     
-    scores = query.all()
-    
-    result = []
-    for score in scores:
-        result.append({
-            'id': score.id,
-            'user_id': score.user_id,
-            'quiz_id': score.quiz_id,
-            'total_score': score.total_score,
-            'max_score': score.max_score,
-            'percentage': (score.total_score / score.max_score * 100) if score.max_score > 0 else 0
-        })
-    
-    return jsonify(result)
+    if wants_ndjson():
+        return ndjson_response(query, Score, serialize_score)
+    return paginated_response(query, Score, serialize_score)
 
 @api.route('/scores/<int:score_id>', methods=['GET'])
 def get_score(score_id):
@@ -0,0 +1,14 @@
+from flask import Blueprint, Response
+from app.utils.metrics import metrics as metrics_registry
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.route('/metrics')
+def export():
+    """
+    Expose the metrics of all worker processes for Prometheus to scrape.
+    
+    Returns:
+        Response: Metrics in the Prometheus text exposition format
+    """
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
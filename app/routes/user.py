@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify, flash
+from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify, flash, abort
 from app.models.database import User, Subject, Chapter, Quiz, Question, Score, db
-from app.utils.helpers import user_required, is_quiz_available, search_subjects, search_quizzes, format_datetime, calculate_score_statistics, get_subject_scores, calculate_percentage
-from app.utils.chart_utils import generate_user_performance_chart, generate_subject_performance_chart
+from app.utils.helpers import user_required, is_quiz_available, search_subjects, search_quizzes, format_datetime, calculate_percentage
+from app.utils.chart_utils import generate_user_performance_chart, generate_subject_performance_chart, chart_response
+from app.utils.answer_keys import answer_keys, grade_submission
+from app.utils.quiz_cache import quiz_payloads, get_question_fragment
+from app.utils.submissions import submission_queue
+from app.utils.queries import load_subject_tree, get_attempted_quiz_ids, get_score_statistics, get_subject_statistics, get_score_rows, group_by_subject
 
 user = Blueprint('user', __name__, url_prefix='/user')
 
@@ -33,9 +37,11 @@ def view_subject(subject_id):
     Raises:
         404: If subject is not found
     """
-    subject = Subject.query.get_or_404(subject_id)
-    user_scores = Score.query.filter_by(user_id=session['user_id']).all()
-    attempted_quiz_ids = {score.quiz_id for score in user_scores}
+    subject = load_subject_tree(subject_id)
+    if subject is None:
+        abort(404)
+    attempted_quiz_ids = get_attempted_quiz_ids(session['user_id']) | \
+        submission_queue.pending_quiz_ids(session['user_id'])
     return render_template('user/subject_detail.html', 
                          subject=subject, 
                          attempted_quiz_ids=attempted_quiz_ids)
@@ -55,14 +61,18 @@ def quiz_detail(quiz_id):
     Raises:
         404: If quiz is not found
     """
-    quiz = Quiz.query.get_or_404(quiz_id)
-    existing_score = Score.query.filter_by(user_id=session['user_id'], quiz_id=quiz_id).first()
+    payload = quiz_payloads.get(quiz_id)
+    if payload is None:
+        abort(404)
+    quiz = payload.quiz
+    existing_score = submission_queue.pending(session['user_id'], quiz_id) or \
+        Score.query.filter_by(user_id=session['user_id'], quiz_id=quiz_id).first()
     
     # Check if the quiz is within the valid timeframe
     is_available = is_quiz_available(quiz)
     
     return render_template('user/quiz_detail.html', 
-                         quiz=quiz, 
+                         quiz=quiz,
                          existing_score=existing_score,
                          is_available=is_available)
 
@@ -82,49 +92,51 @@ def attempt_quiz(quiz_id):
     Raises:
         404: If quiz is not found
     """
-    quiz = Quiz.query.get_or_404(quiz_id)
+    payload = quiz_payloads.get(quiz_id)
+    if payload is None:
+        abort(404)
+    quiz = payload.quiz
     
     # Check if the quiz is within the valid timeframe
     if not is_quiz_available(quiz):
         flash('This quiz is not available at this time.', 'danger')
         return redirect(url_for('user.quiz_detail', quiz_id=quiz_id))
     
-    existing_score = Score.query.filter_by(user_id=session['user_id'], quiz_id=quiz_id).first()
-    if existing_score:
+    # Pending first: the writer drops an attempt from the queue only after storing it
+    if submission_queue.pending(session['user_id'], quiz_id) or \
+            Score.query.filter_by(user_id=session['user_id'], quiz_id=quiz_id).first():
         flash('You have already attempted this quiz.')
         return redirect(url_for('user.quiz_detail', quiz_id=quiz_id))
     
     if request.method == 'POST':
-        score = 0
-        total_questions = len(quiz.questions)
-        
-        for question in quiz.questions:
-            selected_answer = request.form.get(f'question_{question.id}')
-            if selected_answer and int(selected_answer) == question.correct_option:
-                score += 1
+        answer_key = answer_keys.get(quiz_id)
+        score = grade_submission(answer_key, request.form)
         
-        new_score = Score(
-            quiz_id=quiz_id,
-            user_id=session['user_id'],
-            total_score=score,
-            max_score=total_questions
-        )
-        db.session.add(new_score)
-        db.session.commit()
+        # Stored by the submission writer; the result page reads it from the queue until then
+        if submission_queue.submit(session['user_id'], quiz_id, score, answer_key.question_count) is None:
+            flash('You have already attempted this quiz.')
+            return redirect(url_for('user.quiz_detail', quiz_id=quiz_id))
         
-        return redirect(url_for('user.quiz_result', quiz_id=quiz_id, score_id=new_score.id))
-    
-    return render_template('user/attempt_quiz.html', quiz=quiz)
+        return redirect(url_for('user.quiz_result', quiz_id=quiz_id))
+    
+    question_fragment = get_question_fragment(payload)
+    if question_fragment is None:
+        abort(404)
+    return render_template('user/attempt_quiz.html',
+                         quiz=quiz,
+                         question_fragment=question_fragment)
 
+@user.route('/quiz/<int:quiz_id>/result')
 @user.route('/quiz/<int:quiz_id>/result/<int:score_id>')
 @user_required
-def quiz_result(quiz_id, score_id):
+def quiz_result(quiz_id, score_id=None):
     """
     Display the result of a completed quiz attempt.
     
     Args:
         quiz_id (int): ID of the completed quiz
-        score_id (int): ID of the user's score entry
+        score_id (int, optional): ID of the user's score entry; without it,
+            the user's own attempt at the quiz, which may still be queued
     
     Returns:
         rendered template: Quiz result view with score and percentage
@@ -133,7 +145,11 @@ def quiz_result(quiz_id, score_id):
         404: If quiz or score is not found
     """
     quiz = Quiz.query.get_or_404(quiz_id)
-    score = Score.query.get_or_404(score_id)
+    if score_id is not None:
+        score = Score.query.get_or_404(score_id)
+    else:
+        score = submission_queue.pending(session['user_id'], quiz_id) or \
+            Score.query.filter_by(user_id=session['user_id'], quiz_id=quiz_id).first_or_404()
     percentage = calculate_percentage(score.total_score, score.max_score)
     return render_template('user/quiz_result.html', quiz=quiz, score=score, percentage=percentage) 
 
@@ -146,24 +162,41 @@ def quiz_summary():
     Returns:
         rendered template: Summary view with performance statistics and charts
     """
-    user_scores = Score.query.filter_by(user_id=session['user_id']).all()
-    
-    stats = calculate_score_statistics(user_scores)
-    subject_scores = get_subject_scores(user_scores)
-    
-    # Generate performance charts
-    performance_chart = generate_user_performance_chart(user_scores)
-    subject_chart = generate_subject_performance_chart(subject_scores)
+    stats = get_score_statistics(session['user_id'])
+    subject_scores = group_by_subject(get_score_rows(session['user_id']))
     
     return render_template('user/quiz_summary.html', 
-                         user_scores=user_scores,
                          total_quizzes=stats['total_quizzes'],
                          average_score=stats['average_score'],
                          best_score=stats['best_score'],
                          worst_score=stats['worst_score'],
-                         subject_scores=subject_scores,
-                         performance_chart=performance_chart,
-                         subject_chart=subject_chart) 
+                         subject_scores=subject_scores)
+
+@user.route('/charts/performance.png')
+@user_required
+def performance_chart():
+    """
+    Serve the chart of the user's performance over time.
+    
+    Returns:
+        Response: PNG image with ETag and Cache-Control headers,
+                  or 304 Not Modified on a matching conditional GET
+    """
+    score_rows = get_score_rows(session['user_id'])
+    return chart_response(generate_user_performance_chart(score_rows))
+
+@user.route('/charts/subjects.png')
+@user_required
+def subject_chart():
+    """
+    Serve the chart of the user's average performance by subject.
+    
+    Returns:
+        Response: PNG image with ETag and Cache-Control headers,
+                  or 304 Not Modified on a matching conditional GET
+    """
+    subject_stats = get_subject_statistics(session['user_id'])
+    return chart_response(generate_subject_performance_chart(subject_stats))
 
 @user.route('/search', methods=['GET'])
 @user_required
@@ -0,0 +1,34 @@
+from collections import namedtuple
+from app.models.database import db, Question
+from app.utils.quiz_cache import QuizCache
+
+# Compact grading data for a quiz: answers is a tuple of (question_id, correct_option)
+AnswerKey = namedtuple('AnswerKey', ['question_count', 'answers'])
+
+def build_answer_key(quiz_id):
+    """Load the answer key of a quiz with one query"""
+    rows = db.session.query(Question.id, Question.correct_option) \
+        .filter(Question.quiz_id == quiz_id) \
+        .order_by(Question.id) \
+        .all()
+    return AnswerKey(len(rows), tuple((question_id, correct) for question_id, correct in rows))
+
+answer_keys = QuizCache(build_answer_key)
+
+def grade_submission(answer_key, form):
+    """
+    Count the correct answers in a submitted quiz form.
+
+    Args:
+        answer_key (AnswerKey): Key of the quiz being graded
+        form: Mapping of 'question_<id>' fields to the selected option
+
+    Returns:
+        int: Number of correctly answered questions
+    """
+    score = 0
+    for question_id, correct_option in answer_key.answers:
+        selected_answer = form.get(f'question_{question_id}')
+        if selected_answer and selected_answer.isdigit() and int(selected_answer) == correct_option:
+            score += 1
+    return score
@@ -0,0 +1,282 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from app.models.database import db, Quiz, Question
+from app.utils.quiz_cache import mark_quiz_changed
+
+QUESTION_FIELDS = ('question_statement', 'option1', 'option2', 'option3', 'option4', 'correct_option')
+OPTION_MAX_LENGTH = 255
+
+# Rows inserted per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Rejected rows listed in a report; further rejections are only counted
+MAX_REPORTED_ERRORS = 1000
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+CSV_MIMETYPE = 'text/csv'
+
+class ImportFormatError(ValueError):
+    """Raised when an uploaded document cannot be read at all, as opposed to a single bad row"""
+
+class ImportReport:
+    """
+    Outcome of a bulk import.
+
+    Attributes:
+        inserted (int): Rows stored
+        rejected (int): Rows skipped because they were invalid or could not be stored
+        errors (list): {'row': int, 'errors': [str]} per rejected row, up to MAX_REPORTED_ERRORS
+    """
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, row, messages, **location):
+        """Record a rejected row; location adds e.g. the position of a nested question"""
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, **location, 'errors': messages})
+
+    def as_dict(self):
+        return {
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'errors_truncated': self.rejected > len(self.errors)
+        }
+
+def iter_records(stream, mimetype, formats=(JSON_MIMETYPE, NDJSON_MIMETYPE, CSV_MIMETYPE)):
+    """
+    Read the records of an uploaded document one at a time.
+
+    NDJSON and CSV are read line by line, so large uploads are validated and
+    inserted without being held in memory. A JSON array is parsed as a whole.
+
+    Args:
+        stream: Binary file object with the document
+        mimetype (str): application/json, application/x-ndjson or text/csv
+        formats (tuple): The mimetypes accepted by the caller
+
+    Yields:
+        tuple: (row number from 1, record dict or None, error message or None)
+
+    Raises:
+        ImportFormatError: If the format is not accepted or the document is unreadable
+    """
+    if mimetype not in formats:
+        raise ImportFormatError(f"Unsupported content type '{mimetype}'; send {', '.join(formats)}")
+
+    if mimetype == JSON_MIMETYPE:
+        try:
+            records = json.load(stream)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ImportFormatError(f'Invalid JSON: {e}')
+        if not isinstance(records, list):
+            raise ImportFormatError('Expected a JSON array of objects')
+        for row, record in enumerate(records, start=1):
+            yield (row, record, None) if isinstance(record, dict) else (row, None, 'Expected a JSON object')
+        return
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if mimetype == CSV_MIMETYPE else None)
+    try:
+        if mimetype == NDJSON_MIMETYPE:
+            row = 0
+            for line in text:
+                if not line.strip():
+                    continue
+                row += 1
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield row, None, f'Invalid JSON: {e}'
+                    continue
+                yield (row, record, None) if isinstance(record, dict) else (row, None, 'Expected a JSON object')
+        else:
+            reader = csv.DictReader(text)
+            missing = [field for field in QUESTION_FIELDS if field not in (reader.fieldnames or ())]
+            if missing:
+                raise ImportFormatError(f"CSV header is missing: {', '.join(missing)}")
+            for row, record in enumerate(reader, start=1):
+                yield row, record, None
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f'The document is not UTF-8: {e}')
+
+def validate_question(record):
+    """
+    Check one question record from JSON or CSV.
+
+    Returns:
+        tuple: (column values, list of error messages); the values are only
+               meaningful when there are no errors
+    """
+    values = {}
+    errors = []
+    for field in QUESTION_FIELDS[:-1]:
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f'{field} is required')
+        elif field != 'question_statement' and len(value.strip()) > OPTION_MAX_LENGTH:
+            errors.append(f'{field} must be at most {OPTION_MAX_LENGTH} characters')
+        else:
+            values[field] = value.strip()
+
+    correct_option = record.get('correct_option')
+    if isinstance(correct_option, str) and correct_option.strip().isdigit():
+        correct_option = int(correct_option)
+    if not isinstance(correct_option, int) or isinstance(correct_option, bool) or correct_option not in range(1, 5):
+        errors.append('correct_option must be 1, 2, 3 or 4')
+    else:
+        values['correct_option'] = correct_option
+    return values, errors
+
+def validate_quiz(record):
+    """
+    Check the quiz fields of one quiz record; its questions are checked separately.
+
+    Returns:
+        tuple: (column values without chapter_id, list of error messages)
+    """
+    values = {}
+    errors = []
+    try:
+        values['date_of_quiz'] = datetime.fromisoformat(record['date_of_quiz'])
+    except (KeyError, TypeError, ValueError):
+        errors.append('date_of_quiz must be an ISO date')
+    for field in ('start_time', 'end_time'):
+        try:
+            values[field] = datetime.strptime(record[field], '%H:%M:%S').time()
+        except (KeyError, TypeError, ValueError):
+            errors.append(f'{field} must be in HH:MM:SS format')
+    try:
+        values['time_duration'] = int(record['time_duration'])
+        if isinstance(record['time_duration'], bool) or values['time_duration'] <= 0:
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        errors.append('time_duration must be a positive number of minutes')
+    if not isinstance(record.get('questions', []), list):
+        errors.append('questions must be a list')
+    return values, errors
+
+def import_questions(quiz_id, records, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate and insert questions for a quiz.
+
+    Valid rows are inserted with one executemany INSERT per chunk, each chunk
+    in its own transaction. Invalid rows are reported and skipped; a chunk
+    the database refuses is rolled back and its rows reported.
+
+    Args:
+        quiz_id (int): ID of an existing quiz
+        records: (row, record, error) tuples as yielded by iter_records()
+        chunk_size (int): Rows per transaction
+
+    Returns:
+        ImportReport: Counts and per-row errors
+    """
+    report = ImportReport()
+    chunk = []
+
+    def store():
+        try:
+            db.session.execute(insert(Question), [values for _, values in chunk])
+            mark_quiz_changed(db.session, quiz_id)
+            db.session.commit()
+            report.inserted += len(chunk)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for row, _ in chunk:
+                report.reject(row, [f'Database error: {e.__class__.__name__}'])
+        chunk.clear()
+
+    for row, record, error in records:
+        if error:
+            report.reject(row, [error])
+            continue
+        values, errors = validate_question(record)
+        if errors:
+            report.reject(row, errors)
+            continue
+        chunk.append((row, {**values, 'quiz_id': quiz_id}))
+        if len(chunk) >= chunk_size:
+            store()
+    if chunk:
+        store()
+    return report
+
+def import_quizzes(chapter_id, records, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate and insert quizzes, each with its questions, for a chapter.
+
+    A quiz with invalid fields is rejected together with its questions; an
+    invalid question is rejected on its own and the rest of its quiz is
+    stored. Quizzes are inserted with executemany ... RETURNING to learn their
+    IDs, then their questions with a second executemany, in transactions of
+    about chunk_size rows.
+
+    Args:
+        chapter_id (int): ID of an existing chapter
+        records: (row, record, error) tuples as yielded by iter_records()
+        chunk_size (int): Quiz and question rows per transaction
+
+    Returns:
+        tuple: (ImportReport of quizzes, number of questions inserted)
+    """
+    report = ImportReport()
+    questions_inserted = 0
+    chunk = []  # (row, quiz values, [question values])
+
+    def store():
+        nonlocal questions_inserted
+        try:
+            quiz_ids = db.session.execute(
+                insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+                [quiz for _, quiz, _ in chunk]
+            ).scalars().all()
+            question_rows = [
+                {**question, 'quiz_id': quiz_id}
+                for quiz_id, (_, _, questions) in zip(quiz_ids, chunk) for question in questions
+            ]
+            if question_rows:
+                db.session.execute(insert(Question), question_rows)
+            db.session.commit()
+            report.inserted += len(chunk)
+            questions_inserted += len(question_rows)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for row, _, _ in chunk:
+                report.reject(row, [f'Database error: {e.__class__.__name__}'])
+        chunk.clear()
+
+    pending_rows = 0
+    for row, record, error in records:
+        if error:
+            report.reject(row, [error])
+            continue
+        quiz, errors = validate_quiz(record)
+        if errors:
+            report.reject(row, errors)
+            continue
+        questions = []
+        for number, question_record in enumerate(record.get('questions', []), start=1):
+            if not isinstance(question_record, dict):
+                report.reject(row, ['Expected a JSON object'], question=number)
+                continue
+            question, errors = validate_question(question_record)
+            if errors:
+                report.reject(row, errors, question=number)
+            else:
+                questions.append(question)
+        chunk.append((row, {**quiz, 'chapter_id': chapter_id}, questions))
+        pending_rows += 1 + len(questions)
+        if pending_rows >= chunk_size:
+            store()
+            pending_rows = 0
+    if chunk:
+        store()
+    return report, questions_inserted
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app.models.database import db, Score, Quiz, User
+from app.utils.chart_pool import ChartRenderError, placeholder_chart
+from app.utils.metrics import metrics
+
+# Rendered charts depend only on rows of these models
+CHART_SOURCE_MODELS = (Score, Quiz, User)
+
+class ChartCache:
+    """
+    In-process LRU cache of rendered charts with a total byte budget.
+
+    Attributes:
+        max_bytes (int): Upper bound on the summed size of cached charts
+        hits (int): Number of lookups served from the cache
+        misses (int): Number of lookups that required a render
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read the byte budget from the app config"""
+        self.max_bytes = app.config.get('CHART_CACHE_MAX_BYTES', self.max_bytes)
+
+    def get(self, key):
+        """Return the cached chart for key, or None"""
+        with self._lock:
+            chart = self._entries.get(key)
+            if chart is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return chart
+
+    def put(self, key, chart):
+        """Store a chart, evicting least recently used entries to stay within budget"""
+        size = len(chart)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = chart
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        """Drop every cached chart"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def after_fork(self):
+        """Replace the lock, which a thread of the parent process may have held when it forked"""
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        """Total bytes currently cached"""
+        return self._size
+
+chart_cache = ChartCache()
+
+def table_fingerprint(model):
+    """Return (row count, max id) for a model's table, a cheap change marker"""
+    return tuple(db.session.query(func.count(model.id), func.max(model.id)).one())
+
+def cached_chart(chart_type, fingerprint):
+    """
+    Cache a chart generator's output by chart type and input fingerprint.
+
+    Args:
+        chart_type (str): Name distinguishing this chart from others
+        fingerprint (callable): Receives the generator's arguments and returns
+            a value identifying the data the chart is drawn from
+
+    A render that fails with ChartRenderError yields the placeholder image,
+    which is not cached so the next request tries again.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            digest = hashlib.sha1(repr(fingerprint(*args, **kwargs)).encode('utf-8')).hexdigest()
+            key = (chart_type, digest)
+            chart = chart_cache.get(key)
+            if chart is None:
+                started = time.perf_counter()
+                try:
+                    chart = f(*args, **kwargs)
+                except ChartRenderError:
+                    return placeholder_chart()
+                finally:
+                    metrics.observe('quizmaster_chart_render_seconds', time.perf_counter() - started, chart=chart_type)
+                chart_cache.put(key, chart)
+            return chart
+        return decorated_function
+    return decorator
+
+@event.listens_for(Session, 'after_flush')
+def mark_charts_stale(session, flush_context):
+    """Remember that this transaction touched data the charts are drawn from"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, CHART_SOURCE_MODELS):
+            session.info['charts_stale'] = True
+            return
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_charts(session):
+    """Clear the chart cache once a transaction that changed chart data commits"""
+    if session.info.pop('charts_stale', False):
+        chart_cache.clear()
+
+@event.listens_for(Session, 'after_rollback')
+def discard_stale_mark(session):
+    """Forget the stale mark of a rolled back transaction"""
+    session.info.pop('charts_stale', None)
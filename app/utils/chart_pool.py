@@ -0,0 +1,107 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from chart_renderers import render_placeholder_chart
+
+class ChartRenderError(Exception):
+    """Raised when a chart could not be rendered in time or the pool is saturated"""
+
+class ChartPool:
+    """
+    Renders charts in a pool of worker processes so matplotlib never runs on
+    (or holds the GIL of) a web worker.
+
+    Jobs must be functions of the chart_renderers module, which the workers
+    import without the app, taking plain picklable values and returning PNG
+    bytes. At most queue_size jobs may be pending at once; further
+    submissions fail fast instead of piling up behind slow renders.
+
+    Attributes:
+        workers (int): Number of worker processes; 0 renders in-process
+        queue_size (int): Maximum number of pending and running jobs
+        timeout (float): Seconds to wait for a single job
+    """
+    def __init__(self, workers=2, queue_size=8, timeout=10):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read pool settings from the app config"""
+        self.workers = app.config.get('CHART_POOL_WORKERS', self.workers)
+        self.queue_size = app.config.get('CHART_POOL_QUEUE_SIZE', self.queue_size)
+        self.timeout = app.config.get('CHART_RENDER_TIMEOUT', self.timeout)
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+
+    def _get_executor(self):
+        """Start the worker processes on first use"""
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the web server may already be running threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def render(self, job, *args):
+        """
+        Run a render job and return its PNG bytes.
+
+        Raises:
+            ChartRenderError: If the queue is full, the job timed out or failed
+        """
+        if self.workers <= 0:
+            try:
+                return job(*args)
+            except Exception as e:
+                raise ChartRenderError(str(e)) from e
+
+        if not self._slots.acquire(blocking=False):
+            raise ChartRenderError('Chart render queue is full')
+        try:
+            future = self._get_executor().submit(job, *args)
+        except Exception as e:
+            self._slots.release()
+            raise ChartRenderError(str(e)) from e
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise ChartRenderError('Chart render timed out')
+        except Exception as e:
+            raise ChartRenderError(str(e)) from e
+
+    def after_fork(self):
+        """Forget the parent's worker processes; a forked process starts its own on first use"""
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+chart_pool = ChartPool()
+atexit.register(chart_pool.shutdown)
+
+class PlaceholderChart(bytes):
+    """PNG of the placeholder image; a distinct type so responses can tell it from a chart"""
+
+_placeholder = None
+
+def placeholder_chart():
+    """Return a small PNG shown in place of a chart that could not be rendered"""
+    global _placeholder
+    if _placeholder is None:
+        _placeholder = PlaceholderChart(render_placeholder_chart())
+    return _placeholder
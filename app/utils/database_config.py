@@ -0,0 +1,43 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+DEFAULT_DATABASE_URI = 'sqlite:///quiz_master.db'
+
+def is_memory_sqlite(uri):
+    """Check whether a URI names an in-memory SQLite database"""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    - SQLite file: the default pool; SQLite connections are cheap and local,
+      so pool sizing does not apply
+    - SQLite in memory: a single shared connection (StaticPool), as every new
+      connection would otherwise see its own empty database
+    - Any other server database (e.g. PostgreSQL): a QueuePool sized by
+      DB_POOL_SIZE and DB_MAX_OVERFLOW, checking connections with a ping before
+      use (DB_POOL_PRE_PING) and replacing them after DB_POOL_RECYCLE seconds,
+      so connections dropped by the server or a proxy are never handed out
+
+    Args:
+        config (dict): App config with SQLALCHEMY_DATABASE_URI and the DB_POOL_* settings
+
+    Returns:
+        dict: Keyword arguments for sqlalchemy.create_engine
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if is_memory_sqlite(uri):
+        return {
+            'poolclass': StaticPool,
+            'connect_args': {'check_same_thread': False}
+        }
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800)
+    }
@@ -3,7 +3,11 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from flask import session, redirect, url_for, flash
 from datetime import datetime, date
-from sqlalchemy import or_
+from sqlalchemy import or_, cast, String
+from app.utils.search_index import fts_enabled, search_ids
+
+# Maximum number of results returned by each search helper
+SEARCH_RESULT_LIMIT = 50
 
 def is_valid_email(email):
     """Check if an email is valid"""
@@ -94,55 +98,81 @@ def get_user_from_session():
     
     return None
 
-def search_users(query):
+def rows_in_order(model, ids):
+    """Load rows of a model by ID, keeping the order of ids"""
+    if not ids:
+        return []
+    rows = {row.id: row for row in model.query.filter(model.id.in_(ids)).all()}
+    return [rows[row_id] for row_id in ids if row_id in rows]
+
+def search_users(query, limit=SEARCH_RESULT_LIMIT):
     """Search for users by username, email, or full name"""
     from app.models.database import User
     
+    if fts_enabled():
+        return rows_in_order(User, search_ids('user_fts', query, limit))
+    
     return User.query.filter(
         or_(
             User.username.ilike(f'%{query}%'),
             User.email.ilike(f'%{query}%'),
             User.full_name.ilike(f'%{query}%')
         )
-    ).all()
+    ).limit(limit).all()
 
-def search_subjects(query):
+def search_subjects(query, limit=SEARCH_RESULT_LIMIT):
     """Search for subjects by name or description"""
     from app.models.database import Subject
     
+    if fts_enabled():
+        return rows_in_order(Subject, search_ids('subject_fts', query, limit))
+    
     return Subject.query.filter(
         or_(
             Subject.name.ilike(f'%{query}%'),
             Subject.description.ilike(f'%{query}%')
         )
-    ).all()
+    ).limit(limit).all()
 
-def search_chapters(query):
+def search_chapters(query, limit=SEARCH_RESULT_LIMIT):
     """Search for chapters by name or description"""
     from app.models.database import Chapter
     
+    if fts_enabled():
+        return rows_in_order(Chapter, search_ids('chapter_fts', query, limit))
+    
     return Chapter.query.filter(
         or_(
             Chapter.name.ilike(f'%{query}%'),
             Chapter.description.ilike(f'%{query}%')
         )
-    ).all()
+    ).limit(limit).all()
 
-def search_quizzes(query):
+def search_quizzes(query, limit=SEARCH_RESULT_LIMIT):
     """Search for quizzes by related chapter name or duration"""
     from app.models.database import Quiz, Chapter
     
+    if fts_enabled():
+        conditions = [Quiz.chapter_id.in_(search_ids('chapter_fts', query, limit))]
+        if query.isdigit():
+            conditions.append(Quiz.time_duration == int(query))
+        return Quiz.query.filter(or_(*conditions)).limit(limit).all()
+    
     return Quiz.query.join(Chapter).filter(
         or_(
             Chapter.name.ilike(f'%{query}%'),
-            Quiz.time_duration.ilike(f'%{query}%')
+            # time_duration is an integer; PostgreSQL has no LIKE for integers
+            cast(Quiz.time_duration, String).ilike(f'%{query}%')
         )
-    ).all()
+    ).limit(limit).all()
 
-def search_questions(query):
+def search_questions(query, limit=SEARCH_RESULT_LIMIT):
     """Search for questions by question statement or options"""
     from app.models.database import Question
     
+    if fts_enabled():
+        return rows_in_order(Question, search_ids('question_fts', query, limit))
+    
     return Question.query.filter(
         or_(
             Question.question_statement.ilike(f'%{query}%'),
@@ -151,59 +181,4 @@ def search_questions(query):
             Question.option3.ilike(f'%{query}%'),
             Question.option4.ilike(f'%{query}%')
         )
-    ).all()
-
-def calculate_score_statistics(user_scores):
-    """Calculate score statistics from a list of user scores"""
-    total_quizzes = len(user_scores)
-    if total_quizzes == 0:
-        return {
-            'total_quizzes': 0,
-            'average_score': 0,
-            'best_score': 0,
-            'worst_score': 0
-        }
-    
-    try:
-        score_percentages = [calculate_percentage(score.total_score, score.max_score) for score in user_scores]
-        if not score_percentages:
-            return {
-                'total_quizzes': total_quizzes,
-                'average_score': 0,
-                'best_score': 0,
-                'worst_score': 0
-            }
-        
-        average_score = sum(score_percentages) / len(score_percentages)
-        best_score = max(score_percentages)
-        worst_score = min(score_percentages)
-        
-        return {
-            'total_quizzes': total_quizzes,
-            'average_score': round(average_score, 1),
-            'best_score': round(best_score, 1),
-            'worst_score': round(worst_score, 1)
-        }
-    except Exception:
-        return {
-            'total_quizzes': total_quizzes,
-            'average_score': 0,
-            'best_score': 0,
-            'worst_score': 0
-        }
-
-def get_subject_scores(user_scores):
-    """Group scores by subject and calculate percentages"""
-    subject_scores = {}
-    for score in user_scores:
-        subject = score.quiz.chapter.subject
-        if subject.name not in subject_scores:
-            subject_scores[subject.name] = []
-        percentage = calculate_percentage(score.total_score, score.max_score)
-        subject_scores[subject.name].append({
-            'score': score,
-            'percentage': percentage
-        })
-    
-    return subject_scores
-
+    ).limit(limit).all()
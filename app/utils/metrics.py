@@ -0,0 +1,323 @@
+import atexit
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: a scrape may then see a file while it is being merged
+    fcntl = None
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Totals of exited processes, merged from their own files
+ARCHIVE_FILE = 'metrics-archive.db'
+
+# Exposed metrics: name -> (type, help)
+METRICS = {
+    'quizmaster_http_requests_total': ('counter', 'Requests handled, by endpoint, method and status'),
+    'quizmaster_http_request_duration_seconds': ('histogram', 'Request latency by endpoint'),
+    'quizmaster_db_queries_total': ('counter', 'SQL statements executed, by endpoint'),
+    'quizmaster_db_seconds_total': ('counter', 'Time spent executing SQL, by endpoint'),
+    'quizmaster_chart_render_seconds': ('histogram', 'Time to render a chart on a cache miss, by chart'),
+    'quizmaster_cache_hits_total': ('counter', 'Cache lookups served from memory, by cache'),
+    'quizmaster_cache_misses_total': ('counter', 'Cache lookups that had to build the entry, by cache'),
+    'quizmaster_submission_write_seconds': ('histogram', 'Time to store one batch of queued quiz submissions'),
+    'quizmaster_submissions_written_total': ('counter', 'Queued quiz submissions stored in the score table'),
+    'quizmaster_submission_write_errors_total': ('counter', 'Failed submission batch writes, retried later'),
+    'quizmaster_submissions_dead_lettered_total': ('counter', 'Queued quiz submissions moved to the dead-letter file')
+}
+
+class MmapValues:
+    """
+    Float values by key in a memory-mapped file written by a single process.
+
+    The file starts with the number of bytes in use, followed by entries of
+    (key length, key padded to 8 bytes, value as a double). A value is updated
+    in place with one aligned 8-byte write, so other processes can read the
+    file at any time without locking.
+    """
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._positions = {}
+        self._used = struct.unpack_from('i', self._map, 0)[0] or 8
+        for key, _, position in self._read_entries(self._map, self._used):
+            self._positions[key] = position
+
+    @staticmethod
+    def _read_entries(buffer, used):
+        offset = 8
+        while offset < used:
+            length = struct.unpack_from('i', buffer, offset)[0]
+            padded = length + (-(length + 4) % 8)
+            key = bytes(buffer[offset + 4:offset + 4 + length]).decode('utf-8')
+            position = offset + 4 + padded
+            yield key, struct.unpack_from('d', buffer, position)[0], position
+            offset = position + 8
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode('utf-8')
+            padded = len(encoded) + (-(len(encoded) + 4) % 8)
+            entry = struct.pack(f'i{padded}sd', len(encoded), encoded, 0.0)
+            while self._used + len(entry) > self._capacity:
+                self._capacity *= 2
+                self._file.truncate(self._capacity)
+                self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), self._capacity)
+            self._map[self._used:self._used + len(entry)] = entry
+            position = self._used + 4 + padded
+            self._used += len(entry)
+            # Publish the entry only after it is fully written
+            struct.pack_into('i', self._map, 0, self._used)
+            self._positions[key] = position
+        return position
+
+    def increment(self, key, amount=1.0):
+        position = self._position(key)
+        value = struct.unpack_from('d', self._map, position)[0]
+        struct.pack_into('d', self._map, position, value + amount)
+
+    def set(self, key, value):
+        struct.pack_into('d', self._map, self._position(key), value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    @classmethod
+    def read(cls, path):
+        """Return [(key, value)] of a file written by any process"""
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < 8:
+            return []
+        return [(key, value) for key, value, _ in cls._read_entries(data, struct.unpack_from('i', data, 0)[0])]
+
+def sample_key(name, labels):
+    """Format a sample name with its labels in Prometheus text syntax"""
+    if not labels:
+        return name
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return name + '{' + ','.join(f'{label}="{value}"' for label, value in zip(labels, escaped)) + '}'
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+class Metrics:
+    """
+    Request, database, chart and cache metrics shared by all worker processes.
+
+    Each process writes its own file metrics-<pid>.db in METRICS_DIR; the
+    /metrics endpoint sums the files of every process, so the numbers are the
+    same whichever worker serves the scrape. When a process exits its file is
+    added to ARCHIVE_FILE and deleted, so counters never go backwards and the
+    directory does not grow with every worker ever started. A worker that is
+    killed cannot do this itself; the gunicorn master does it from child_exit.
+
+    Histogram buckets are stored non-cumulative (one write per observation)
+    and made cumulative when exposed.
+
+    Attributes:
+        directory (str): Directory holding the per-process files; None disables recording
+    """
+    def __init__(self):
+        self.directory = None
+        self._values = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._files_lock = threading.Lock()
+        self._caches = {}
+        self._cache_reported = {}
+        self._cache_sync_interval = 1.0
+        self._cache_synced = 0.0
+
+    def init_app(self, app):
+        """Set up the metrics directory and record every request"""
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        self.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    def after_fork(self):
+        """
+        Replace the lock; _store() opens a new file for the new process on the next write.
+
+        The cache counts inherited from the parent are already in the
+        parent's file, so only hits and misses from now on are reported.
+        """
+        self._lock = threading.Lock()
+        self._files_lock = threading.Lock()
+        self._cache_reported = {name: (cache.hits, cache.misses) for name, cache in self._caches.items()}
+
+    def track_cache(self, name, cache):
+        """Report the hits and misses attributes of a cache under the given name"""
+        self._caches[name] = cache
+
+    def _store(self):
+        # A forked worker must not write to its parent's file
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._values = MmapValues(os.path.join(self.directory, f'metrics-{self._pid}.db'))
+        return self._values
+
+    def increment(self, name, amount=1.0, **labels):
+        """Add amount to a counter"""
+        if self.directory is None:
+            return
+        with self._lock:
+            self._store().increment(sample_key(name, labels), amount)
+
+    def observe(self, name, value, **labels):
+        """Record a duration in seconds in a histogram with LATENCY_BUCKETS"""
+        if self.directory is None:
+            return
+        bound = next((bound for bound in LATENCY_BUCKETS if value <= bound), float('inf'))
+        with self._lock:
+            store = self._store()
+            store.increment(sample_key(f'{name}_bucket', {**labels, 'le': format_bound(bound)}))
+            store.increment(sample_key(f'{name}_sum', labels), value)
+            store.increment(sample_key(f'{name}_count', labels))
+
+    def start_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.increment('quizmaster_http_requests_total',
+                       endpoint=endpoint, method=request.method, status=response.status_code)
+        self.observe('quizmaster_http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+        stats = g.get('query_stats')
+        if stats is not None:
+            self.increment('quizmaster_db_queries_total', stats.count, endpoint=endpoint)
+            self.increment('quizmaster_db_seconds_total', stats.duration, endpoint=endpoint)
+        if time.monotonic() - self._cache_synced > self._cache_sync_interval:
+            self.sync_cache_counters()
+        return response
+
+    def sync_cache_counters(self):
+        """Add the hits and misses of this process's caches since the last sync to its file"""
+        if self.directory is None:
+            return
+        with self._lock:
+            store = self._store()
+            for name, cache in self._caches.items():
+                hits, misses = cache.hits, cache.misses
+                reported_hits, reported_misses = self._cache_reported.get(name, (0, 0))
+                store.increment(sample_key('quizmaster_cache_hits_total', {'cache': name}), hits - reported_hits)
+                store.increment(sample_key('quizmaster_cache_misses_total', {'cache': name}), misses - reported_misses)
+                self._cache_reported[name] = (hits, misses)
+        self._cache_synced = time.monotonic()
+
+    @contextmanager
+    def _files_locked(self, exclusive):
+        # Scrapes share the lock; merging the file of an exited process takes it alone.
+        # A POSIX lock, which a process forked during a scrape does not inherit;
+        # it is per process, so the threads of this one take turns.
+        with self._files_lock, open(os.path.join(self.directory, 'metrics.lock'), 'a+') as lock:
+            if fcntl is not None:
+                fcntl.lockf(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def collect(self):
+        """Return the summed samples of every process as {sample key: value}"""
+        self.sync_cache_counters()
+        totals = {}
+        with self._files_locked(exclusive=False):
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.db')):
+                for key, value in MmapValues.read(path):
+                    totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def retire_process(self, pid):
+        """
+        Add the file of an exited process to ARCHIVE_FILE and delete it.
+
+        Args:
+            pid (int): Process ID of the exited process; nothing happens if it left no file
+        """
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, f'metrics-{pid}.db')
+        with self._files_locked(exclusive=True):
+            if not os.path.exists(path):
+                return
+            archive = MmapValues(os.path.join(self.directory, ARCHIVE_FILE))
+            try:
+                for key, value in MmapValues.read(path):
+                    archive.increment(key, value)
+            finally:
+                archive.close()
+            os.remove(path)
+
+    def shutdown(self):
+        """Record the final cache counts of this process and retire its file"""
+        if self.directory is None:
+            return
+        self.sync_cache_counters()
+        with self._lock:
+            self._values.close()
+            self._pid = None
+            self.retire_process(os.getpid())
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        totals = self.collect()
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            if metric_type == 'histogram':
+                lines.extend(self._render_histogram(name, totals))
+            else:
+                lines.extend(f'{key} {value:g}' for key, value in sorted(totals.items())
+                             if key.split('{', 1)[0] == name)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(name, totals):
+        series = {}
+        for key, value in totals.items():
+            sample, _, labels = key.partition('{')
+            labels = labels.rstrip('}')
+            if sample == f'{name}_bucket':
+                labels, separator, bound = labels.rpartition(',le=')
+                if not separator:
+                    bound = bound[len('le='):]
+                series.setdefault(labels, {}).setdefault('buckets', {})[bound.strip('"')] = value
+            elif sample in (f'{name}_sum', f'{name}_count'):
+                series.setdefault(labels, {})[sample[len(name) + 1:]] = value
+
+        lines = []
+        for labels, values in sorted(series.items()):
+            prefix = labels + ',' if labels else ''
+            cumulative = 0.0
+            for bound in (*LATENCY_BUCKETS, float('inf')):
+                cumulative += values.get('buckets', {}).get(format_bound(bound), 0.0)
+                lines.append(f'{name}_bucket{{{prefix}le="{format_bound(bound)}"}} {cumulative:g}')
+            suffix = '{' + labels + '}' if labels else ''
+            lines.append(f'{name}_sum{suffix} {values.get("sum", 0.0):g}')
+            lines.append(f'{name}_count{suffix} {values.get("count", 0.0):g}')
+        return lines
+
+metrics = Metrics()
+atexit.register(metrics.shutdown)
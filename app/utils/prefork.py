@@ -0,0 +1,65 @@
+import gc
+import os
+import weakref
+from sqlalchemy.orm import configure_mappers
+from app.models.database import db
+from app.utils.chart_cache import chart_cache
+from app.utils.chart_pool import chart_pool
+from app.utils.metrics import metrics
+from app.utils.prewarm import quiz_prewarmer
+from app.utils.quiz_cache import QuizCache
+from app.utils.submissions import submission_queue
+from app.utils.templates import precompile_templates
+
+def preload(app):
+    """
+    Do the start-up work of a pre-fork server once, in its master process.
+
+    Compiles every template and configures the ORM mappers, so workers
+    inherit them instead of each building its own copy on its first
+    requests. The objects created so far are then moved out of the garbage
+    collector's reach: collections in the workers would otherwise write to
+    them and turn the pages shared with the master into private copies.
+
+    Args:
+        app (Flask): The application, as returned by create_app()
+    """
+    configure_mappers()
+    precompile_templates(app)
+    gc.collect()
+    gc.freeze()
+
+def reset_after_fork(apps):
+    """
+    Give a forked process its own database connections, locks and background threads.
+
+    Args:
+        apps (list): The applications whose engines the child must not share
+    """
+    for app in apps:
+        with app.app_context():
+            for engine in db.engines.values():
+                # close=False: the parent still owns its pooled connections
+                engine.dispose(close=False)
+    for cache in QuizCache.instances:
+        cache.after_fork()
+    for component in (chart_cache, chart_pool, metrics, submission_queue, quiz_prewarmer):
+        component.after_fork()
+
+# Apps whose connections are replaced in forked children. The fork hook is
+# registered once per process, however many apps it creates.
+_fork_safe_apps = weakref.WeakSet()
+_fork_hook_registered = False
+
+def _after_fork_in_child():
+    reset_after_fork(list(_fork_safe_apps))
+
+def init_fork_safety(app):
+    """Reset the app's process-level state in every process forked after this call"""
+    global _fork_hook_registered
+    if not hasattr(os, 'register_at_fork'):  # Windows cannot fork
+        return
+    if not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _fork_hook_registered = True
+    _fork_safe_apps.add(app)
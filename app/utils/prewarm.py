@@ -0,0 +1,113 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from app.models.database import db, Quiz
+from app.utils.quiz_cache import QuizCache
+
+logger = logging.getLogger(__name__)
+
+def quiz_window(quiz):
+    """Return the (start, end) datetimes during which a quiz can be attempted"""
+    quiz_date = quiz.date_of_quiz.date()
+    return datetime.combine(quiz_date, quiz.start_time), datetime.combine(quiz_date, quiz.end_time)
+
+def quizzes_to_warm(now, lead):
+    """
+    Return IDs of quizzes starting within lead of now or currently running.
+
+    Args:
+        now (datetime): Current time
+        lead (timedelta): How far ahead of its start a quiz is warmed
+
+    Returns:
+        list: Quiz IDs
+    """
+    first_day = datetime.combine(now.date(), datetime.min.time())
+    last_day = datetime.combine((now + lead).date(), datetime.min.time())
+    quizzes = Quiz.query.filter(
+        Quiz.date_of_quiz >= first_day,
+        Quiz.date_of_quiz <= last_day
+    ).all()
+
+    quiz_ids = []
+    for quiz in quizzes:
+        start, end = quiz_window(quiz)
+        if start - lead <= now <= end:
+            quiz_ids.append(quiz.id)
+    return quiz_ids
+
+def warm_quiz(quiz_id):
+    """Rebuild every cached view of a quiz: metadata, questions and answer key"""
+    for cache in QuizCache.instances:
+        cache.refresh(quiz_id)
+
+class QuizPrewarmer:
+    """
+    Background thread that keeps the quiz caches hot around quiz start times.
+
+    Every interval seconds it finds quizzes starting within lead_minutes or
+    already running and rebuilds their cache entries. The rebuild happens
+    before the start time, so the requests of a class opening a quiz together
+    are served from memory. As long as interval is shorter than the cache TTL,
+    the entries never expire while the quiz is live.
+
+    Attributes:
+        lead_minutes (float): How long before its start a quiz is warmed
+        interval (float): Seconds between scans
+    """
+    def __init__(self, lead_minutes=10, interval=30):
+        self.lead_minutes = lead_minutes
+        self.interval = interval
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """Read the schedule from the app config"""
+        self._app = app
+        self.lead_minutes = app.config.get('QUIZ_PREWARM_LEAD_MINUTES', self.lead_minutes)
+        self.interval = app.config.get('QUIZ_PREWARM_INTERVAL', self.interval)
+
+    def start(self):
+        """Start the scanning thread, if it is not already running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='quiz-prewarmer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scanning thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def after_fork(self):
+        """Restart the scanning thread in a forked process if it ran in the parent"""
+        running = self._thread is not None and not self._stop.is_set()
+        self._stop = threading.Event()
+        self._thread = None
+        if running:
+            self.start()
+
+    def scan(self):
+        """Warm every quiz in or near its window; returns the warmed quiz IDs"""
+        with self._app.app_context():
+            try:
+                quiz_ids = quizzes_to_warm(datetime.now(), timedelta(minutes=self.lead_minutes))
+                for quiz_id in quiz_ids:
+                    warm_quiz(quiz_id)
+                return quiz_ids
+            finally:
+                db.session.remove()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception:
+                logger.exception('Quiz prewarm scan failed')
+            self._stop.wait(self.interval)
+
+quiz_prewarmer = QuizPrewarmer()
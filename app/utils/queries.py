@@ -0,0 +1,287 @@
+from collections import namedtuple
+from sqlalchemy import func, case, cast, Float
+from sqlalchemy.orm import selectinload
+from app.models.database import db, User, Subject, Chapter, Quiz, Question, Score
+from app.utils.helpers import calculate_percentage
+
+# Read-only view models handed to templates instead of live ORM objects,
+# so rendering can never trigger a lazy load.
+SubjectTree = namedtuple('SubjectTree', ['id', 'name', 'description', 'chapters'])
+ChapterNode = namedtuple('ChapterNode', ['id', 'name', 'description', 'quizzes'])
+QuizNode = namedtuple('QuizNode', ['id', 'date_of_quiz', 'start_time', 'end_time', 'time_duration', 'question_count'])
+ScoreRow = namedtuple('ScoreRow', ['id', 'quiz_id', 'total_score', 'max_score', 'percentage', 'date_of_quiz', 'chapter_name', 'subject_name'])
+UserActivity = namedtuple('UserActivity', ['id', 'username', 'full_name', 'email', 'quiz_count', 'average_score'])
+SubjectStats = namedtuple('SubjectStats', ['subject_name', 'total_quizzes', 'average_score', 'best_score', 'worst_score'])
+
+# Score percentage computed by the database, 0 when max_score is not positive.
+# Cast to float, as PostgreSQL would otherwise return exact numerics (Decimal).
+score_percentage = cast(case(
+    (Score.max_score > 0, Score.total_score * 100.0 / Score.max_score),
+    else_=0
+), Float)
+
+def get_question_counts(subject_id):
+    """Return a {quiz_id: question_count} map for every quiz under a subject"""
+    rows = db.session.query(Question.quiz_id, func.count(Question.id)) \
+        .join(Quiz, Question.quiz_id == Quiz.id) \
+        .join(Chapter, Quiz.chapter_id == Chapter.id) \
+        .filter(Chapter.subject_id == subject_id) \
+        .group_by(Question.quiz_id) \
+        .all()
+    return dict(rows)
+
+def load_subject_tree(subject_id):
+    """
+    Load a subject with its chapters, quizzes and per-quiz question counts.
+
+    Uses a fixed number of queries regardless of the size of the tree: one for
+    the subject, one each for chapters and quizzes (selectinload) and one
+    grouped COUNT for the questions.
+
+    Args:
+        subject_id (int): ID of the subject to load
+
+    Returns:
+        SubjectTree: Read-only view of the subject, or None if not found
+    """
+    subject = Subject.query.options(
+        selectinload(Subject.chapters).selectinload(Chapter.quizzes)
+    ).filter_by(id=subject_id).first()
+    if subject is None:
+        return None
+
+    question_counts = get_question_counts(subject_id)
+
+    chapters = tuple(
+        ChapterNode(
+            id=chapter.id,
+            name=chapter.name,
+            description=chapter.description,
+            quizzes=tuple(
+                QuizNode(
+                    id=quiz.id,
+                    date_of_quiz=quiz.date_of_quiz,
+                    start_time=quiz.start_time,
+                    end_time=quiz.end_time,
+                    time_duration=quiz.time_duration,
+                    question_count=question_counts.get(quiz.id, 0)
+                ) for quiz in chapter.quizzes
+            )
+        ) for chapter in subject.chapters
+    )
+    return SubjectTree(
+        id=subject.id,
+        name=subject.name,
+        description=subject.description,
+        chapters=chapters
+    )
+
+def get_attempted_quiz_ids(user_id):
+    """Return the set of quiz IDs a user has attempted, without loading Score rows"""
+    rows = db.session.query(Score.quiz_id).filter(Score.user_id == user_id).all()
+    return {quiz_id for (quiz_id,) in rows}
+
+def round_stat(value):
+    """Round an aggregate percentage for display, treating NULL as 0"""
+    return round(value, 1) if value is not None else 0
+
+def get_score_statistics(user_id):
+    """
+    Return count, average, best and worst percentage over a user's scores.
+
+    Computed by a single aggregate query, so the cost does not depend on
+    how many attempts the user has made.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        dict: total_quizzes, average_score, best_score and worst_score
+    """
+    total, average, best, worst = db.session.query(
+        func.count(Score.id),
+        func.avg(score_percentage),
+        func.max(score_percentage),
+        func.min(score_percentage)
+    ).filter(Score.user_id == user_id).one()
+    return {
+        'total_quizzes': total,
+        'average_score': round_stat(average),
+        'best_score': round_stat(best),
+        'worst_score': round_stat(worst)
+    }
+
+def get_quiz_participation(quiz_ids):
+    """
+    Return the number of attempts and the average percentage of each quiz.
+
+    Computed by a single GROUP BY query, however many scores the quizzes have.
+
+    Args:
+        quiz_ids (list): IDs of the quizzes
+
+    Returns:
+        dict: quiz ID -> (participants, average percentage); quizzes nobody
+              has attempted are left out
+    """
+    rows = db.session.query(
+        Score.quiz_id,
+        func.count(Score.id),
+        func.avg(score_percentage)
+    ).filter(Score.quiz_id.in_(quiz_ids)).group_by(Score.quiz_id).all()
+    return {quiz_id: (participants, average) for quiz_id, participants, average in rows}
+
+def get_subject_statistics(user_id):
+    """
+    Return a user's score statistics grouped by subject, in one GROUP BY query.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        list: SubjectStats per attempted subject, ordered by subject name
+    """
+    rows = db.session.query(
+        Subject.name,
+        func.count(Score.id),
+        func.avg(score_percentage),
+        func.max(score_percentage),
+        func.min(score_percentage)
+    ).select_from(Score) \
+        .join(Quiz, Score.quiz_id == Quiz.id) \
+        .join(Chapter, Quiz.chapter_id == Chapter.id) \
+        .join(Subject, Chapter.subject_id == Subject.id) \
+        .filter(Score.user_id == user_id) \
+        .group_by(Subject.id, Subject.name) \
+        .order_by(Subject.name) \
+        .all()
+    return [
+        SubjectStats(name, total, round_stat(average), round_stat(best), round_stat(worst))
+        for name, total, average, best, worst in rows
+    ]
+
+def get_score_rows(user_id):
+    """
+    Return every score of a user with its quiz date, chapter and subject.
+
+    A single joined query replaces the per-score lazy loads of
+    score.quiz.chapter.subject.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        list: ScoreRow view models ordered by score ID
+    """
+    rows = db.session.query(
+        Score.id, Score.quiz_id, Score.total_score, Score.max_score,
+        Quiz.date_of_quiz, Chapter.name, Subject.name
+    ).select_from(Score) \
+        .join(Quiz, Score.quiz_id == Quiz.id) \
+        .join(Chapter, Quiz.chapter_id == Chapter.id) \
+        .join(Subject, Chapter.subject_id == Subject.id) \
+        .filter(Score.user_id == user_id) \
+        .order_by(Score.id) \
+        .all()
+    return [
+        ScoreRow(
+            id=score_id,
+            quiz_id=quiz_id,
+            total_score=total_score,
+            max_score=max_score,
+            percentage=calculate_percentage(total_score, max_score),
+            date_of_quiz=date_of_quiz,
+            chapter_name=chapter_name,
+            subject_name=subject_name
+        ) for score_id, quiz_id, total_score, max_score, date_of_quiz, chapter_name, subject_name in rows
+    ]
+
+def group_by_subject(score_rows):
+    """Group ScoreRows into an ordered {subject_name: [ScoreRow, ...]} map"""
+    grouped = {}
+    for row in score_rows:
+        grouped.setdefault(row.subject_name, []).append(row)
+    return grouped
+
+# Sort keys accepted by get_user_activity_page
+USER_SORT_COLUMNS = {
+    'username': User.username,
+    'full_name': User.full_name,
+    'email': User.email,
+    'id': User.id
+}
+ACTIVITY_SORT_KEYS = ('quiz_count', 'average_score')
+
+def user_activity_subquery(user_ids=None):
+    """Per-user quiz count and average percentage as a GROUP BY subquery"""
+    query = db.session.query(
+        Score.user_id.label('user_id'),
+        func.count(Score.id).label('quiz_count'),
+        func.avg(score_percentage).label('average_score')
+    )
+    if user_ids is not None:
+        query = query.filter(Score.user_id.in_(user_ids))
+    return query.group_by(Score.user_id).subquery()
+
+def get_user_activity_page(page=1, per_page=50, sort='username', order='asc'):
+    """
+    Return one page of users with their quiz count and average percentage.
+
+    When sorting by a user column, the page of users is selected first and
+    only their scores are aggregated. Sorting by an activity figure joins the
+    full per-user aggregate. Either way the cost is a fixed number of queries.
+
+    Args:
+        page (int): 1-based page number
+        per_page (int): Number of users per page
+        sort (str): A key of USER_SORT_COLUMNS or one of ACTIVITY_SORT_KEYS
+        order (str): 'asc' or 'desc'
+
+    Returns:
+        tuple: (list of UserActivity, total number of users)
+    """
+    total = db.session.query(func.count(User.id)).scalar()
+    offset = (page - 1) * per_page
+    user_columns = (User.id, User.username, User.full_name, User.email)
+
+    if sort in ACTIVITY_SORT_KEYS:
+        stats = user_activity_subquery()
+        quiz_count = func.coalesce(stats.c.quiz_count, 0)
+        sort_column = quiz_count if sort == 'quiz_count' else func.coalesce(stats.c.average_score, -1)
+        sort_column = sort_column.desc() if order == 'desc' else sort_column.asc()
+        rows = db.session.query(*user_columns, quiz_count, stats.c.average_score) \
+            .outerjoin(stats, stats.c.user_id == User.id) \
+            .order_by(sort_column, User.id) \
+            .offset(offset).limit(per_page).all()
+        return [UserActivity(*row) for row in rows], total
+
+    sort_column = USER_SORT_COLUMNS.get(sort, User.username)
+    sort_column = sort_column.desc() if order == 'desc' else sort_column.asc()
+    users = db.session.query(*user_columns) \
+        .order_by(sort_column, User.id) \
+        .offset(offset).limit(per_page).all()
+
+    stats = user_activity_subquery([user.id for user in users])
+    activity = {
+        user_id: (quiz_count, average_score)
+        for user_id, quiz_count, average_score in db.session.query(
+            stats.c.user_id, stats.c.quiz_count, stats.c.average_score
+        ).all()
+    }
+    return [UserActivity(*user, *activity.get(user.id, (0, None))) for user in users], total
+
+def get_user_activity_series():
+    """
+    Return per-user activity as plain series for the admin user statistics chart.
+
+    Returns:
+        tuple: (quiz count of every user, average percentage of every user
+                who has attempted at least one quiz)
+    """
+    stats = user_activity_subquery()
+    rows = db.session.query(stats.c.quiz_count, stats.c.average_score).all()
+    total = db.session.query(func.count(User.id)).scalar()
+    quiz_counts = [quiz_count for quiz_count, _ in rows]
+    quiz_counts += [0] * (total - len(rows))
+    avg_performances = [average_score for _, average_score in rows]
+    return quiz_counts, avg_performances
@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+class QueryStats:
+    """
+    SQL statements executed during one request or one measured block.
+
+    Attributes:
+        count (int): Number of statements executed
+        duration (float): Seconds spent executing them
+        statements (Counter): Executions per distinct SQL string
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._parameters = {}
+
+    def record(self, statement, parameters, duration, executemany=False):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        # An executemany batch can hold thousands of rows; only its size tells batches apart
+        distinct = f'{len(parameters)} rows' if executemany else repr(parameters)
+        self._parameters.setdefault(statement, set()).add(distinct)
+
+    def repeated_statements(self, threshold):
+        """
+        Return statements run at least threshold times with different parameters.
+
+        The same SELECT issued once per row of an earlier result, each time with
+        another ID, is the signature of an N+1 query pattern.
+
+        Returns:
+            list: (statement, executions) pairs, most executed first
+        """
+        return [
+            (statement, executions) for statement, executions in self.statements.most_common()
+            if executions >= threshold and len(self._parameters[statement]) > 1
+        ]
+
+    def summary(self, limit=5):
+        """Describe the most executed statements, for log and assertion messages"""
+        lines = [f'{self.count} queries in {self.duration * 1000:.1f} ms']
+        for statement, executions in self.statements.most_common(limit):
+            lines.append(f'  {executions}x {" ".join(statement.split())[:200]}')
+        return '\n'.join(lines)
+
+# Kept per thread, so the statements of background threads are not counted
+# against a block another thread has open
+class _Recorders(threading.local):
+    """QueryStats of the active record_queries blocks of the current thread"""
+    def __init__(self):
+        self.active = []
+
+_recorders = _Recorders()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+    stats = g.get('query_stats') if has_app_context() else None
+    if stats is not None:
+        stats.record(statement, parameters, duration, executemany)
+    for recorder in _recorders.active:
+        recorder.record(statement, parameters, duration, executemany)
+
+class QueryInspector:
+    """
+    Counts and times the SQL of every request and reports likely N+1 patterns.
+
+    In debug mode (or with QUERY_STATS_HEADERS) each response carries
+    X-Query-Count, X-Query-Time-Ms and X-N-Plus-One headers. Requests that
+    exceed SLOW_REQUEST_MS or SLOW_REQUEST_QUERIES, or that repeat one
+    statement N_PLUS_ONE_THRESHOLD times with different parameters, are logged
+    with their most executed statements.
+
+    Attributes:
+        slow_ms (float): Request duration that triggers a log entry
+        slow_queries (int): Query count that triggers a log entry
+        n_plus_one_threshold (int): Repetitions of one statement flagged as N+1
+    """
+    def __init__(self, slow_ms=500, slow_queries=50, n_plus_one_threshold=5):
+        self.slow_ms = slow_ms
+        self.slow_queries = slow_queries
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.headers = False
+
+    def init_app(self, app):
+        """Read the thresholds from the app config and hook into every request"""
+        self.slow_ms = app.config.get('SLOW_REQUEST_MS', self.slow_ms)
+        self.slow_queries = app.config.get('SLOW_REQUEST_QUERIES', self.slow_queries)
+        self.n_plus_one_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        self.headers = app.config.get('QUERY_STATS_HEADERS', app.debug)
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    def start_request(self):
+        g.query_stats = QueryStats()
+        g.request_started = time.perf_counter()
+
+    def finish_request(self, response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        elapsed_ms = (time.perf_counter() - g.pop('request_started')) * 1000
+        repeated = stats.repeated_statements(self.n_plus_one_threshold)
+
+        if self.headers:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = f'{stats.duration * 1000:.1f}'
+            response.headers['X-N-Plus-One'] = str(len(repeated))
+
+        if repeated:
+            logger.warning('Likely N+1 queries in %s %s: %s', request.method, request.path, '; '.join(
+                f'{executions}x {" ".join(statement.split())[:200]}' for statement, executions in repeated
+            ))
+        if elapsed_ms > self.slow_ms or stats.count > self.slow_queries:
+            logger.warning('Slow request %s %s took %.0f ms\n%s',
+                           request.method, request.path, elapsed_ms, stats.summary())
+        return response
+
+query_inspector = QueryInspector()
+
+@contextmanager
+def record_queries():
+    """
+    Record the SQL statements the current thread executes inside the block.
+
+    Yields:
+        QueryStats: Filled in as statements run
+    """
+    stats = QueryStats()
+    _recorders.active.append(stats)
+    try:
+        yield stats
+    finally:
+        _recorders.active.remove(stats)
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the enclosed block executes more than limit SQL statements.
+
+    Only statements of the current thread count; a background thread such as
+    the quiz prewarmer or the submission writer cannot make the block fail.
+
+    Usage:
+        with assert_max_queries(5):
+            client.get('/user/subject/1')
+
+    Yields:
+        QueryStats: The statements recorded so far
+
+    Raises:
+        AssertionError: If more than limit statements were executed
+    """
+    with record_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise AssertionError(f'Expected at most {limit} queries, got {stats.summary(limit=10)}')
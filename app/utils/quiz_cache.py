@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import namedtuple
+from flask import render_template
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.database import db, Subject, Chapter, Quiz, Question
+
+# Read-only quiz data for the quiz detail and attempt pages. QuestionView
+# deliberately leaves out the correct option.
+QuizView = namedtuple('QuizView', ['id', 'chapter_id', 'chapter_name', 'subject_id', 'subject_name',
+                                   'date_of_quiz', 'start_time', 'end_time', 'time_duration', 'question_count'])
+QuestionView = namedtuple('QuestionView', ['id', 'question_statement', 'option1', 'option2', 'option3', 'option4'])
+QuizPayload = namedtuple('QuizPayload', ['quiz', 'questions'])
+# Pre-rendered question list of the attempt page; version identifies the question set
+QuestionFragment = namedtuple('QuestionFragment', ['version', 'html'])
+
+class QuizCache:
+    """
+    In-process cache of data derived from one quiz and its questions.
+
+    Entries are dropped when the quiz or one of its questions changes in
+    this process, and expire after ttl seconds, which bounds how long another
+    worker process can serve outdated data. Every instance is invalidated by
+    the session hooks at the bottom of this module.
+
+    Attributes:
+        build (callable): Builds the entry for a quiz ID, or returns None
+        ttl (float): Seconds an entry stays valid
+        hits (int): Number of lookups served from the cache
+        misses (int): Number of lookups that required a build
+    """
+    instances = []
+
+    def __init__(self, build, ttl=60):
+        self.build = build
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        QuizCache.instances.append(self)
+
+    def init_app(self, app):
+        """Read the expiry from the app config"""
+        self.ttl = app.config.get('QUIZ_CACHE_TTL', self.ttl)
+
+    def after_fork(self):
+        """Replace the lock, which a thread of the parent process may have held when it forked"""
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        """Return the entry for a quiz, building it on a miss; None if the quiz does not exist"""
+        entry = self._entries.get(quiz_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return self.refresh(quiz_id)
+
+    def refresh(self, quiz_id):
+        """Rebuild and store the entry for a quiz"""
+        value = self.build(quiz_id)
+        if value is not None:
+            with self._lock:
+                self._entries[quiz_id] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, quiz_id):
+        """Drop the entry for a quiz"""
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+def build_quiz_payload(quiz_id):
+    """Load a quiz's metadata and questions in two queries"""
+    row = db.session.query(
+        Quiz.id, Quiz.chapter_id, Chapter.name, Subject.id, Subject.name,
+        Quiz.date_of_quiz, Quiz.start_time, Quiz.end_time, Quiz.time_duration
+    ).join(Chapter, Quiz.chapter_id == Chapter.id) \
+        .join(Subject, Chapter.subject_id == Subject.id) \
+        .filter(Quiz.id == quiz_id) \
+        .first()
+    if row is None:
+        return None
+
+    questions = tuple(QuestionView(*question) for question in db.session.query(
+        Question.id, Question.question_statement,
+        Question.option1, Question.option2, Question.option3, Question.option4
+    ).filter(Question.quiz_id == quiz_id).order_by(Question.id).all())
+
+    return QuizPayload(QuizView(*row, question_count=len(questions)), questions)
+
+quiz_payloads = QuizCache(build_quiz_payload)
+
+def question_set_version(payload):
+    """Identify the exact questions of a payload, for matching rendered fragments"""
+    return hash(payload.questions)
+
+def build_question_fragment(quiz_id):
+    """Render the question list of a quiz's attempt page once for all users"""
+    payload = quiz_payloads.get(quiz_id)
+    if payload is None:
+        return None
+    html = render_template('user/_quiz_questions.html', questions=payload.questions)
+    return QuestionFragment(question_set_version(payload), Markup(html))
+
+question_fragments = QuizCache(build_question_fragment)
+
+def get_question_fragment(payload):
+    """
+    Return the rendered question list for a quiz payload.
+
+    The cached fragment is used only if it was rendered from the same
+    question set as the payload; otherwise it is rendered again.
+
+    Args:
+        payload (QuizPayload): The quiz being attempted
+
+    Returns:
+        Markup: HTML of the question list, or None if the quiz was deleted
+                in the meantime
+    """
+    fragment = question_fragments.get(payload.quiz.id)
+    if fragment is None or fragment.version != question_set_version(payload):
+        fragment = question_fragments.refresh(payload.quiz.id)
+    if fragment is None:
+        return None
+    return fragment.html
+
+def init_quiz_caches(app):
+    """Configure every quiz cache from the app config"""
+    for cache in QuizCache.instances:
+        cache.init_app(app)
+
+def mark_quiz_changed(session, quiz_id):
+    """Drop the cached entries of a quiz once the session commits; for changes made with Core statements"""
+    session.info.setdefault('changed_quiz_ids', set()).add(quiz_id)
+
+@event.listens_for(Session, 'after_flush')
+def collect_changed_quizzes(session, flush_context):
+    """Remember the quizzes whose data this transaction changed"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Question):
+            mark_quiz_changed(session, obj.quiz_id)
+        elif isinstance(obj, Quiz):
+            mark_quiz_changed(session, obj.id)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_quiz_caches(session):
+    """Drop cached entries of quizzes changed by a committed transaction"""
+    for quiz_id in session.info.pop('changed_quiz_ids', ()):
+        for cache in QuizCache.instances:
+            cache.invalidate(quiz_id)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_quizzes(session):
+    """Forget the changes of a rolled back transaction"""
+    session.info.pop('changed_quiz_ids', None)
@@ -0,0 +1,141 @@
+import re
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.models.database import db
+
+# FTS5 tables mirroring searchable columns. They use external content, so the
+# text is stored once in the source table and the index holds only tokens.
+SEARCH_TABLES = {
+    'user_fts': ('user', ('username', 'email', 'full_name')),
+    'subject_fts': ('subject', ('name', 'description')),
+    'chapter_fts': ('chapter', ('name', 'description')),
+    'question_fts': ('question', ('question_statement', 'option1', 'option2', 'option3', 'option4'))
+}
+
+def fts5_available(connection):
+    """Check whether the connected database is SQLite with the FTS5 extension"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        connection.execute(text('CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)'))
+        connection.execute(text('DROP TABLE temp.fts5_probe'))
+        return True
+    except OperationalError:
+        return False
+
+def create_search_index(connection, tables=SEARCH_TABLES):
+    """
+    Create the FTS5 tables and the triggers that keep them in sync.
+
+    Triggers rather than ORM events keep the index correct for Core bulk
+    inserts and raw SQL too. A newly created table is filled from its source
+    table with the FTS5 'rebuild' command.
+
+    Args:
+        connection: Connection to a SQLite database with FTS5
+        tables (dict): Subset of SEARCH_TABLES to create
+    """
+    existing = {row[0] for row in connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ))}
+
+    for fts_table, (source, columns) in tables.items():
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        delete_old = (
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert_new = f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});"
+
+        connection.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5('
+            f'{column_list}, content="{source}", content_rowid="id")'
+        ))
+        connection.execute(text(
+            f'CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON "{source}" '
+            f'BEGIN {insert_new} END'
+        ))
+        connection.execute(text(
+            f'CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON "{source}" '
+            f'BEGIN {delete_old} END'
+        ))
+        connection.execute(text(
+            f'CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON "{source}" '
+            f'BEGIN {delete_old} {insert_new} END'
+        ))
+
+        if fts_table not in existing:
+            connection.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+
+def drop_search_triggers(connection, tables=SEARCH_TABLES):
+    """Stop syncing the FTS5 tables, e.g. during a bulk load; create_search_index restores the triggers"""
+    for fts_table in tables:
+        for suffix in ('ai', 'ad', 'au'):
+            connection.execute(text(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}'))
+
+def rebuild_search_index(connection, tables=SEARCH_TABLES):
+    """Re-index the FTS5 tables from their source tables"""
+    for fts_table in tables:
+        connection.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+
+def search_tables_exist(connection, tables=SEARCH_TABLES):
+    """Check whether every FTS5 table has been created"""
+    existing = {row[0] for row in connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ))}
+    return all(fts_table in existing for fts_table in tables)
+
+def init_search_index(app, create=False):
+    """
+    Detect whether the app's database can be searched through the FTS5 index.
+
+    Args:
+        app (Flask): The application
+        create (bool): Create the FTS5 tables and triggers first, if FTS5 is available
+    """
+    with app.app_context():
+        with db.engine.begin() as connection:
+            enabled = fts5_available(connection)
+            if enabled and create:
+                create_search_index(connection)
+            elif enabled:
+                enabled = search_tables_exist(connection)
+    app.extensions['fts5'] = enabled
+
+def fts_enabled():
+    """Check whether the current app searches through the FTS5 index"""
+    return current_app.extensions.get('fts5', False)
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query matching rows containing every word.
+
+    Each word is quoted, so FTS5 operators in user input are treated as text,
+    and matched as a prefix, so results appear while a word is still being typed.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search_ids(fts_table, query, limit):
+    """
+    Return source-table IDs matching query, best bm25 rank first.
+
+    Args:
+        fts_table (str): A key of SEARCH_TABLES
+        query (str): Free-text search term
+        limit (int): Maximum number of IDs to return
+
+    Returns:
+        list: Matching IDs in rank order
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    rows = db.session.execute(text(
+        f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :expression '
+        f'ORDER BY rank LIMIT :limit'
+    ), {'expression': expression, 'limit': limit})
+    return [row[0] for row in rows]
@@ -0,0 +1,67 @@
+from sqlalchemy import event
+from app.models.database import db
+
+# Named sets of PRAGMAs applied to every new SQLite connection.
+#   default: SQLite's own settings, a rollback journal where writers block readers
+#   wal:     write-ahead log, so readers never wait for the writer, with fsync only
+#            at checkpoints; a commit survives an application crash but may be lost
+#            on power failure, which suits quiz data
+SQLITE_PROFILES = {
+    'default': {},
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative: KiB rather than pages, so 64 MiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    }
+}
+
+def resolve_pragmas(profile, overrides=None):
+    """
+    Return the PRAGMAs of a named profile with individual settings overridden.
+
+    Args:
+        profile (str): A key of SQLITE_PROFILES
+        overrides (dict, optional): PRAGMA name to value, applied on top
+
+    Returns:
+        dict: PRAGMA name to value
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile '{profile}', expected one of {sorted(SQLITE_PROFILES)}")
+    return {**SQLITE_PROFILES[profile], **(overrides or {})}
+
+def apply_pragmas(engine, pragmas):
+    """
+    Run pragmas on every connection the engine opens.
+
+    Pooled connections keep their settings, so the statements run once per
+    connection rather than once per checkout. Engines for other databases are
+    left untouched.
+
+    Args:
+        engine: SQLAlchemy engine
+        pragmas (dict): PRAGMA name to value
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+def init_sqlite_profile(app):
+    """Apply the SQLITE_PROFILE and SQLITE_PRAGMAS config to the app's engine"""
+    pragmas = resolve_pragmas(app.config.get('SQLITE_PROFILE', 'default'), app.config.get('SQLITE_PRAGMAS'))
+    with app.app_context():
+        apply_pragmas(db.engine, pragmas)
@@ -0,0 +1,411 @@
+import atexit
+import errno
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from datetime import datetime
+from contextlib import contextmanager
+from sqlalchemy import insert, tuple_
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.database import db, Score
+from app.utils.chart_cache import chart_cache
+from app.utils.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is then safe for a single process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# A graded quiz attempt that is accepted but may not be in the score table yet
+Submission = namedtuple('Submission', ['id', 'user_id', 'quiz_id', 'total_score', 'max_score'])
+
+class SubmissionWriteError(Exception):
+    """Raised when some attempts of a flush could not be written and stay queued for a retry"""
+
+def parse_journal_line(line):
+    """Parse one journal line; None for a line torn by a crash mid-write, which was never acknowledged"""
+    try:
+        return Submission(**json.loads(line))
+    except (ValueError, TypeError):
+        return None
+
+def insert_ignoring_duplicates(model):
+    """INSERT statement for model that skips rows violating a unique constraint, where supported"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing()
+    return insert(model)
+
+class SubmissionQueue:
+    """
+    Write-behind queue for graded quiz attempts.
+
+    submit() appends the attempt to a journal file, fsyncs it and returns, so
+    a burst of submissions at the end of a quiz does not queue up on the
+    database write lock. A writer thread inserts the journalled attempts into
+    the score table in batched transactions and then removes them from the
+    journal. One writer runs at a time across processes, and it writes the
+    attempts of every process, including those left behind by a process that
+    crashed; inserting them is idempotent thanks to the unique
+    (user_id, quiz_id) index.
+
+    The journal is shared by all processes of the server, so pending() sees
+    an attempt not written yet whichever worker accepted it, and a redirect
+    to the result page works on any worker. An attempt is removed from the
+    journal only after it is committed to the score table.
+
+    A batch the database rejects is written again one attempt at a time, so
+    one bad row cannot hold back the others. An attempt that is rejected on
+    its own in max_attempts flushes is moved to the dead-letter file
+    (journal_path + '.failed') and logged. Errors that say the database is
+    unavailable, rather than that a row is bad, are retried without limit.
+
+    Attributes:
+        journal_path (str): Append-only file of accepted attempts, one JSON object per line
+        batch_size (int): Maximum number of attempts inserted per transaction
+        max_attempts (int): Flushes in which an attempt may fail before it is dead-lettered
+        interval (float): Seconds the writer waits for more attempts before a flush
+        recovery_interval (float): Seconds between checks of a running writer for
+            attempts journalled by other processes that did not write them
+    """
+    def __init__(self, journal_path=None, batch_size=500, interval=0.2, recovery_interval=5, max_attempts=3):
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.interval = interval
+        self.recovery_interval = recovery_interval
+        self._app = None
+        self._journal_cache = {}
+        self._journal_signature = None
+        # Failed flushes and the last error of attempts the database rejected
+        self._failures = Counter()
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        """Read the settings from the app config and write any attempts left in the journal"""
+        self._app = app
+        self.journal_path = app.config.get('SUBMISSION_JOURNAL') or self.journal_path or \
+            os.path.join(app.instance_path, 'submissions.journal')
+        self.batch_size = app.config.get('SUBMISSION_BATCH_SIZE', self.batch_size)
+        self.max_attempts = app.config.get('SUBMISSION_MAX_ATTEMPTS', self.max_attempts)
+        self.interval = app.config.get('SUBMISSION_FLUSH_INTERVAL', self.interval)
+        self.recovery_interval = app.config.get('SUBMISSION_RECOVERY_INTERVAL', self.recovery_interval)
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        self._journal_cache = {}
+        self._journal_signature = None
+        self._wake_if_pending()
+
+    def submit(self, user_id, quiz_id, total_score, max_score):
+        """
+        Durably accept a graded attempt.
+
+        The check for an earlier attempt and the append happen under the
+        journal's file lock, and the writer commits an attempt before it
+        removes it from the journal, so two concurrent submissions of the same
+        user for the same quiz cannot both be accepted, even on different
+        workers. Must be called with an app context.
+
+        Args:
+            user_id (int): ID of the user who took the quiz
+            quiz_id (int): ID of the quiz
+            total_score (int): Number of correct answers
+            max_score (int): Number of questions
+
+        Returns:
+            Submission: The accepted attempt, or None if the user already has
+                        an attempt for this quiz, queued or stored
+        """
+        submission = Submission(uuid.uuid4().hex, user_id, quiz_id, total_score, max_score)
+        with self._journal_locked():
+            if (user_id, quiz_id) in self._journal_pending() or \
+                    db.session.query(Score.id).filter_by(user_id=user_id, quiz_id=quiz_id).first():
+                return None
+            self._append(submission)
+        self.start()
+        self._wake.set()
+        return submission
+
+    def pending(self, user_id, quiz_id):
+        """Return the user's attempt at a quiz if it is not written yet, else None"""
+        return self._read_pending().get((user_id, quiz_id))
+
+    def pending_quiz_ids(self, user_id):
+        """Return the set of quiz IDs with an attempt by the user not written yet"""
+        return {quiz_id for pending_user_id, quiz_id in self._read_pending() if pending_user_id == user_id}
+
+    def start(self):
+        """Start the writer thread, if it is not already running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread after writing every pending attempt"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def after_fork(self):
+        """
+        Reset the threading state copied from the parent process.
+
+        The writer thread does not survive a fork and the lock may have been
+        held by it. Attempts still in the journal are written by the child.
+        """
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._wake_if_pending()
+
+    def flush(self):
+        """
+        Write the attempts in the journal to the score table.
+
+        Returns:
+            int: Number of attempts written
+
+        Raises:
+            SubmissionWriteError: If some attempts were rejected and stay in the journal
+            OperationalError: If the database is unavailable; nothing more is written
+        """
+        written = 0
+        # Attempts rejected in this flush; they are tried again in the next one
+        retry = set()
+        # One writer at a time: concurrent writers would insert the same attempts
+        with self._flush_lock, open(self.journal_path + '.writer.lock', 'a+') as writer_lock:
+            self._lock_file(writer_lock)
+            while True:
+                batch = [submission for submission in self._read_pending().values()
+                         if submission.id not in retry][:self.batch_size]
+                if not batch:
+                    break
+                started = time.perf_counter()
+                with self._app.app_context():
+                    try:
+                        stored, failed = self._write_batch(batch)
+                    finally:
+                        db.session.remove()
+                metrics.observe('quizmaster_submission_write_seconds', time.perf_counter() - started)
+                metrics.increment('quizmaster_submissions_written_total', len(stored))
+                dead = set()
+                for submission in failed:
+                    if self._failures[submission.id] >= self.max_attempts:
+                        self._dead_letter(submission)
+                        dead.add(submission.id)
+                    else:
+                        retry.add(submission.id)
+                self._compact({submission.id for submission in stored} | dead)
+                written += len(stored)
+        if retry:
+            raise SubmissionWriteError(f'{len(retry)} quiz submission(s) could not be written and will be retried')
+        return written
+
+    def _write_batch(self, batch):
+        """
+        Write a batch in one transaction, or one attempt at a time if the database rejects it.
+
+        Returns:
+            tuple: (attempts stored, attempts rejected on their own)
+        """
+        try:
+            self._write(batch)
+            return batch, []
+        except OperationalError:
+            raise
+        except SQLAlchemyError:
+            db.session.rollback()
+            logger.warning('Writing %d quiz submissions in one transaction failed; writing them one at a time',
+                           len(batch), exc_info=True)
+
+        stored, failed = [], []
+        for submission in batch:
+            try:
+                self._write([submission])
+                stored.append(submission)
+                self._failures.pop(submission.id, None)
+                self._errors.pop(submission.id, None)
+            except OperationalError:
+                raise
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                failed.append(submission)
+                self._failures[submission.id] += 1
+                self._errors[submission.id] = str(getattr(e, 'orig', None) or e)
+        return stored, failed
+
+    def _dead_letter(self, submission):
+        """Move an attempt that cannot be written to the dead-letter file"""
+        error = self._errors.pop(submission.id, '')
+        self._failures.pop(submission.id, None)
+        record = {**submission._asdict(), 'error': error, 'failed_at': datetime.now().isoformat()}
+        with open(self.journal_path + '.failed', 'a', encoding='utf-8') as dead_letters:
+            dead_letters.write(json.dumps(record) + '\n')
+            dead_letters.flush()
+            os.fsync(dead_letters.fileno())
+        metrics.increment('quizmaster_submissions_dead_lettered_total')
+        logger.error('Quiz submission %s of user %s for quiz %s failed %d times and was moved to %s: %s',
+                     submission.id, submission.user_id, submission.quiz_id, self.max_attempts,
+                     self.journal_path + '.failed', error)
+
+    def _write(self, batch):
+        """Insert a batch in one transaction, skipping attempts already stored"""
+        keys = [(submission.user_id, submission.quiz_id) for submission in batch]
+        existing = set(db.session.query(Score.user_id, Score.quiz_id)
+                       .filter(tuple_(Score.user_id, Score.quiz_id).in_(keys))
+                       .all())
+        rows = [
+            {
+                'user_id': submission.user_id,
+                'quiz_id': submission.quiz_id,
+                'total_score': submission.total_score,
+                'max_score': submission.max_score
+            } for submission in batch
+            if (submission.user_id, submission.quiz_id) not in existing
+        ]
+        if rows:
+            # Skipping conflicts covers an attempt left in the journal after it was stored
+            db.session.execute(insert_ignoring_duplicates(Score), rows)
+        db.session.commit()
+        # Core inserts bypass the session hooks that invalidate cached charts
+        if rows:
+            chart_cache.clear()
+
+    def _run(self):
+        while True:
+            # Without a wake-up, pick up attempts of processes that exited before writing them
+            if not self._wake.wait(self.recovery_interval) and not self._read_pending():
+                continue
+            stopping = self._stop.is_set()
+            if not stopping:
+                # Let concurrent submissions gather into one transaction
+                self._stop.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Writing quiz submissions failed; retrying')
+                metrics.increment('quizmaster_submission_write_errors_total')
+                if not stopping:
+                    self._stop.wait(self.interval)
+                    self._wake.set()
+                    continue
+            if stopping or self._stop.is_set():
+                return
+
+    def _wake_if_pending(self):
+        """Start the writer when the journal holds attempts, e.g. of a crashed process"""
+        if self._read_pending():
+            self.start()
+            self._wake.set()
+
+    @contextmanager
+    def _journal_locked(self, shared=False):
+        """
+        Hold the journal lock, shared by every process using the journal.
+
+        The lock is taken on a separate file because compaction replaces the
+        journal file itself.
+        """
+        with self._lock, open(self.journal_path + '.lock', 'a+') as lock:
+            self._lock_file(lock, shared)
+            yield
+
+    def _read_pending(self):
+        """Return the attempts in the journal by (user_id, quiz_id)"""
+        with self._journal_locked(shared=True):
+            return self._journal_pending()
+
+    def _journal_pending(self):
+        """
+        Return the attempts in the journal by (user_id, quiz_id); the caller holds the journal lock.
+
+        Between compactions, which replace the file, the journal only grows,
+        so the parsed journal is kept while its inode and size are unchanged
+        and the checks made by page views only cost a stat while no one submits.
+        """
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return {}
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if signature != self._journal_signature:
+            pending = {}
+            with open(self.journal_path, 'rb') as journal:
+                for line in journal:
+                    submission = parse_journal_line(line)
+                    if submission:
+                        pending.setdefault((submission.user_id, submission.quiz_id), submission)
+            self._journal_cache = pending
+            self._journal_signature = signature
+        return self._journal_cache
+
+    def _append(self, submission):
+        """Append an attempt to the journal; the caller holds the journal lock"""
+        line = json.dumps(submission._asdict()) + '\n'
+        with open(self.journal_path, 'ab+') as journal:
+            # Start a new line after a line torn by a crash
+            if journal.seek(0, os.SEEK_END) > 0:
+                journal.seek(-1, os.SEEK_END)
+                if journal.read(1) != b'\n':
+                    line = '\n' + line
+            journal.write(line.encode('utf-8'))
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _compact(self, written_ids):
+        """Replace the journal with the attempts not written yet, including those submitted since"""
+        temporary = self.journal_path + '.tmp'
+        with self._journal_locked():
+            with open(self.journal_path, 'rb') as journal:
+                remaining = [line for line in journal
+                             if (submission := parse_journal_line(line)) and submission.id not in written_ids]
+            with open(temporary, 'wb') as journal:
+                journal.writelines(remaining)
+                journal.flush()
+                os.fsync(journal.fileno())
+            os.replace(temporary, self.journal_path)
+
+    @staticmethod
+    def _lock_file(file, shared=False):
+        # Released when the file is closed. A POSIX lock rather than flock(): a
+        # process forked while the lock is held must not inherit it, or the
+        # child would wait forever on a lock only it can release.
+        # Threads of one process are kept apart by the threading locks.
+        if fcntl is None:
+            return
+        while True:
+            try:
+                fcntl.lockf(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                return
+            except OSError as e:
+                # The kernel sees POSIX locks per process, so two threads of one
+                # process waiting on different locks can look like a deadlock
+                if e.errno != errno.EDEADLK:
+                    raise
+                time.sleep(0.01)
+
+submission_queue = SubmissionQueue()
+atexit.register(submission_queue.stop)
@@ -0,0 +1,27 @@
+import os
+from jinja2 import FileSystemBytecodeCache
+
+def init_templates(app):
+    """
+    Set up template caching from the app config.
+
+    With JINJA_BYTECODE_CACHE_DIR, compiled templates are stored on disk and
+    loaded by every worker, including workers started after a deploy or a
+    recycle, instead of being parsed and compiled again. Jinja checks the
+    source checksum, so an edited template is never served from stale bytecode.
+    With PRECOMPILE_TEMPLATES, every template is compiled during start-up
+    rather than by the first request that renders it.
+    """
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    if app.config.get('PRECOMPILE_TEMPLATES'):
+        precompile_templates(app)
+
+def precompile_templates(app):
+    """Compile every template into the environment's cache; returns the number of templates"""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
@@ -0,0 +1,142 @@
+"""
+Chart renderers run by the chart pool's worker processes.
+
+The workers are spawned, so they import this module afresh. It deliberately
+imports nothing from the app package: a worker loads matplotlib and these
+functions, not Flask, the models or the application's start-up code.
+"""
+import io
+
+def new_figure(**kwargs):
+    """Create a matplotlib Figure; matplotlib is imported on the first chart, not with the app"""
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+def get_png_chart(fig):
+    """Render matplotlib figure to PNG bytes"""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=300)
+    return buf.getvalue()
+
+# Renderers take plain numbers, dates and labels only, and use the
+# object-oriented Figure API so no pyplot global state is involved.
+
+def render_user_performance_chart(dates, percentages):
+    """Render line chart of score percentages against quiz dates"""
+    from matplotlib.dates import date2num
+
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+
+    if not dates:
+        ax.text(0.5, 0.5, 'No quiz data available',
+                horizontalalignment='center', verticalalignment='center',
+                transform=ax.transAxes)
+        return get_png_chart(fig)
+
+    # Create single line plot with connected points
+    ax.plot(date2num(dates), percentages, 'b-o', linewidth=2, markersize=6)
+    ax.xaxis_date()
+
+    ax.set_title('Performance Over Time')
+    ax.set_xlabel('Quiz Date')
+    ax.set_ylabel('Score (%)')
+    ax.grid(True)
+
+    # Set y-axis limits from 0 to 100
+    ax.set_ylim(0, 100)
+
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()  # Adjust layout to prevent label cutoff
+
+    return get_png_chart(fig)
+
+def render_subject_performance_chart(subjects, avg_scores):
+    """Render bar chart of average score percentage per subject"""
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+
+    if not subjects:
+        ax.text(0.5, 0.5, 'No subject data available',
+                horizontalalignment='center', verticalalignment='center',
+                transform=ax.transAxes)
+        return get_png_chart(fig)
+
+    ax.bar(subjects, avg_scores)
+    ax.set_title('Average Performance by Subject')
+    ax.set_xlabel('Subject')
+    ax.set_ylabel('Average Score (%)')
+
+    ax.tick_params(axis='x', labelrotation=45)
+
+    return get_png_chart(fig)
+
+def render_admin_quiz_stats(dates, participants, avg_scores):
+    """Render quiz participation over time and the distribution of quiz averages"""
+    from matplotlib.dates import date2num
+
+    fig = new_figure(figsize=(15, 6))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    ax1.plot(date2num(dates), participants, marker='o')
+    ax1.xaxis_date()
+    ax1.set_title('Quiz Participation Over Time')
+    ax1.set_xlabel('Quiz Date')
+    ax1.set_ylabel('Number of Participants')
+    ax1.grid(True)
+    ax1.tick_params(axis='x', labelrotation=45)
+
+    ax2.hist(avg_scores, bins=10, edgecolor='black')
+    ax2.set_title('Distribution of Average Quiz Scores')
+    ax2.set_xlabel('Average Score (%)')
+    ax2.set_ylabel('Number of Quizzes')
+    ax2.grid(True)
+
+    fig.tight_layout()
+    return get_png_chart(fig)
+
+def render_admin_user_stats(quiz_counts, avg_performances):
+    """Render the distributions of quizzes taken and average score per user"""
+    fig = new_figure(figsize=(15, 6))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    if not quiz_counts:
+        # Handle empty users case
+        for ax in [ax1, ax2]:
+            ax.text(0.5, 0.5, 'No user data available',
+                   horizontalalignment='center', verticalalignment='center',
+                   transform=ax.transAxes)
+        fig.tight_layout()
+        return get_png_chart(fig)
+
+    ax1.hist(quiz_counts, bins=max(10, max(quiz_counts)), edgecolor='black')
+    ax1.set_title('Distribution of User Activity')
+    ax1.set_xlabel('Number of Quizzes Taken')
+    ax1.set_ylabel('Number of Users')
+    ax1.grid(True)
+
+    if avg_performances:
+        ax2.hist(avg_performances, bins=10, edgecolor='black')
+        ax2.set_title('Distribution of User Performance')
+        ax2.set_xlabel('Average Score (%)')
+        ax2.set_ylabel('Number of Users')
+        ax2.grid(True)
+    else:
+        ax2.text(0.5, 0.5, 'No performance data available',
+                horizontalalignment='center', verticalalignment='center',
+                transform=ax2.transAxes)
+
+    fig.tight_layout()
+    return get_png_chart(fig)
+
+def render_placeholder_chart():
+    """Render the small image shown in place of a chart that could not be rendered"""
+    fig = new_figure(figsize=(6, 2))
+    ax = fig.subplots()
+    ax.axis('off')
+    ax.text(0.5, 0.5, 'Chart temporarily unavailable',
+            horizontalalignment='center', verticalalignment='center',
+            transform=ax.transAxes)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100)
+    return buf.getvalue()
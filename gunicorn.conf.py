@@ -0,0 +1,21 @@
+"""Server hooks for gunicorn, which reads this file when started from the project root"""
+from app.utils.metrics import metrics
+from app.utils.prefork import preload
+from app.utils.prewarm import quiz_prewarmer
+
+# Import the app once in the master; workers share it copy-on-write
+preload_app = True
+
+def when_ready(server):
+    """Compile templates and freeze the start-up objects in the master, before any worker forks"""
+    preload(server.app.wsgi())
+
+def post_fork(server, worker):
+    """Start the per-worker background threads; threads of the master would not survive the fork"""
+    app = worker.app.wsgi()
+    if app.config['QUIZ_PREWARM_ENABLED']:
+        quiz_prewarmer.start()
+
+def child_exit(server, worker):
+    """Merge the metrics file of an exited worker; a killed worker cannot do it itself"""
+    metrics.retire_process(worker.pid)
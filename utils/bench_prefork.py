@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# The app is imported inside the functions below: the cold-start workers must
+# be forked from a process that has not imported it yet.
+
+def memory_mb():
+    """Return (USS, PSS) of this process in MiB; USS is the memory no other process shares"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            key, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[key] = int(rest.split()[0])
+    return (values['Private_Clean'] + values['Private_Dirty']) / 1024, values['Pss'] / 1024
+
+def serve_first_request(app, path):
+    response = app.test_client().get(path)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} returned HTTP {response.status_code}')
+
+def fork_worker(boot, path):
+    """
+    Fork a worker that boots, serves one request and reports its boot time and memory.
+
+    Returns:
+        tuple: (pid, result dict); the worker stays alive so shared pages stay shared
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        started = time.perf_counter()
+        serve_first_request(boot(), path)
+        boot_ms = (time.perf_counter() - started) * 1000
+        uss, pss = memory_mb()
+        os.write(write_end, json.dumps({'boot_ms': boot_ms, 'uss_mb': uss, 'pss_mb': pss}).encode('utf-8'))
+        os.close(write_end)
+        signal.pause()
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        return pid, json.loads(pipe.read())
+
+def run_workers(boot, workers, path):
+    """Start workers one after another and return their results"""
+    pids, results = [], []
+    try:
+        for _ in range(workers):
+            pid, result = fork_worker(boot, path)
+            pids.append(pid)
+            results.append(result)
+    finally:
+        for pid in pids:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+    return results
+
+def cold_boot():
+    """What every worker does without preloading: import and create the app"""
+    from app import create_app
+    return create_app()
+
+def summarize(name, results):
+    count = len(results)
+    print(f"{name:<10} {sum(r['boot_ms'] for r in results) / count:>10.0f} "
+          f"{sum(r['uss_mb'] for r in results) / count:>10.1f} {sum(r['pss_mb'] for r in results) / count:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare worker boot time and memory with and without preloading the app '
+                    'in the master process (Linux only)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--path', default='/login', help='Page each worker serves once it has booted')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'prefork.db')}"
+    subprocess.run([sys.executable, '-c', 'from app import create_app, init_schema; init_schema(create_app())'],
+                   cwd=ROOT, check=True)
+
+    cold = run_workers(cold_boot, args.workers, args.path)
+
+    from app import create_app
+    from app.utils.prefork import preload
+    app = create_app()
+    preload(app)
+    preloaded = run_workers(lambda: app, args.workers, args.path)
+
+    print(f"\n{'workers':<10} {'boot ms':>10} {'USS MiB':>10} {'PSS MiB':>10}")
+    summarize('cold', cold)
+    summarize('preloaded', preloaded)
+
+if __name__ == "__main__":
+    main()
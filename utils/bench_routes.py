@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, time as day_time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, init_schema
+from app.models.database import db, User, Subject, Chapter, Quiz, Question
+from app.utils.query_stats import record_queries
+from app.utils.submissions import submission_queue
+from utils.setup_test_db import generate_synthetic_db
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+def percentile(samples, fraction):
+    """Return the nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def add_open_quiz(questions):
+    """Add a quiz that is open all day today and return (quiz ID, question IDs)"""
+    chapter = Chapter.query.first()
+    quiz = Quiz(chapter_id=chapter.id, date_of_quiz=datetime.combine(datetime.now().date(), day_time()),
+                start_time=day_time(0, 0), end_time=day_time(23, 59), time_duration=60)
+    db.session.add(quiz)
+    db.session.flush()
+    for number in range(questions):
+        db.session.add(Question(quiz_id=quiz.id, question_statement=f'Benchmark question {number}',
+                                option1='a', option2='b', option3='c', option4='d', correct_option=1))
+    db.session.commit()
+    return quiz.id, [question.id for question in quiz.questions]
+
+def peak_allocation_kib(request):
+    """Return the peak Python memory allocated while serving one request, in KiB"""
+    tracemalloc.start()
+    try:
+        request()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def measure(name, request, iterations, warmup):
+    """
+    Time a request callable and count its queries.
+
+    The last warmup request is traced with tracemalloc, which would slow down
+    the timed ones, to find the memory a single request of the route needs.
+
+    Returns:
+        dict: p50/p95/p99 latency in ms, median query count and peak allocation in KiB
+    """
+    for _ in range(warmup - 1):
+        request()
+    allocated = peak_allocation_kib(request)
+    latencies = []
+    query_counts = []
+    for _ in range(iterations):
+        with record_queries() as stats:
+            started = time.perf_counter()
+            response = request()
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name} returned HTTP {response.status_code}')
+        query_counts.append(stats.count)
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'queries': percentile(query_counts, 0.50),
+        'peak_alloc_kib': allocated
+    }
+
+def run_routes(app, iterations, warmup):
+    """Drive the hot routes through the test client; returns {route: measurements}"""
+    with app.app_context():
+        quiz_id, question_ids = add_open_quiz(10)
+        subject_id = Subject.query.first().id
+        # The browsing user has scores; the submitting users are the next ones
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)
+                    .limit(iterations + warmup + 1).all()]
+    if len(user_ids) < iterations + warmup + 1:
+        raise SystemExit('Not enough users for the attempt POST benchmark; raise --users')
+
+    def login(username, user_type):
+        client = app.test_client()
+        client.post('/login', data={'username': username, 'password': 'password', 'user_type': user_type})
+        return client
+
+    with app.app_context():
+        usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+    user = login(usernames[user_ids[0]], 'user')
+    admin = login('admin', 'admin')
+    answers = {f'question_{question_id}': '1' for question_id in question_ids}
+    # Each submission needs a user who has not attempted the quiz; they log in before timing starts
+    submitters = iter([login(usernames[user_id], 'user') for user_id in user_ids[1:]])
+
+    routes = {
+        'GET /user/dashboard': lambda: user.get('/user/dashboard'),
+        'GET /user/subject/<id>': lambda: user.get(f'/user/subject/{subject_id}'),
+        'GET /user/quiz/<id>/attempt': lambda: user.get(f'/user/quiz/{quiz_id}/attempt'),
+        'POST /user/quiz/<id>/attempt': lambda: next(submitters).post(f'/user/quiz/{quiz_id}/attempt', data=answers),
+        'GET /user/quiz-summary': lambda: user.get('/user/quiz-summary'),
+        'GET /admin/dashboard': lambda: admin.get('/admin/dashboard'),
+        'GET /admin/users': lambda: admin.get('/admin/users'),
+        'GET /admin/search': lambda: admin.get('/admin/search?query=algebra&type=all'),
+        'GET /api/scores': lambda: admin.get('/api/scores?limit=100'),
+        'GET /api/quizzes/<id>': lambda: admin.get(f'/api/quizzes/{quiz_id}')
+    }
+
+    results = {}
+    for name, request in routes.items():
+        results[name] = measure(name, request, iterations, warmup)
+        print(format_row(name, results[name]), flush=True)
+    submission_queue.flush()
+    return results
+
+def format_row(name, result):
+    return (f"{name:<30} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['queries']:>8} {result['peak_alloc_kib']:>10.1f}")
+
+def compare(results, baseline, threshold, metric):
+    """
+    Return descriptions of routes that regressed against the baseline.
+
+    A route regresses when its latency metric grows by more than threshold
+    percent, or when it runs more queries than before.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        limit = previous[metric] * (1 + threshold / 100)
+        if result[metric] > limit:
+            regressions.append(f"{name}: {metric} {result[metric]:.2f} ms > {previous[metric]:.2f} ms + {threshold:g}%")
+        if result['queries'] > previous['queries']:
+            regressions.append(f"{name}: {result['queries']} queries > {previous['queries']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot routes against a scaled database')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--subjects', type=int, default=10)
+    parser.add_argument('--chapters-per-subject', type=int, default=10)
+    parser.add_argument('--quizzes-per-chapter', type=int, default=10)
+    parser.add_argument('--questions-per-quiz', type=int, default=20)
+    parser.add_argument('--attempt-rate', type=float, default=0.3)
+    parser.add_argument('--database', help='Benchmark an existing database instead of generating one; '
+                                           'a quiz and scores are added to it')
+    parser.add_argument('--iterations', type=int, default=100, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='Untimed requests per route; the last one measures memory')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON file of baseline results')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=20, help='Allowed latency regression in percent')
+    parser.add_argument('--metric', default='p95_ms', choices=('p50_ms', 'p95_ms', 'p99_ms'))
+    args = parser.parse_args()
+    if args.warmup < 1:
+        parser.error('--warmup must be at least 1')
+
+    # Every benchmarked request would otherwise be logged as slow or N+1
+    logging.getLogger('app.utils.query_stats').setLevel(logging.ERROR)
+
+    workdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'SUBMISSION_JOURNAL': os.path.join(workdir, 'submissions.journal'),
+        'METRICS_ENABLED': False
+    })
+    init_schema(app)
+    if not args.database:
+        with app.app_context():
+            generate_synthetic_db(args.users, args.subjects, args.chapters_per_subject,
+                                  args.quizzes_per_chapter, args.questions_per_quiz, args.attempt_rate)
+
+    print(f"\n{'route':<30} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'alloc KiB':>10}")
+    results = run_routes(app, args.iterations, args.warmup)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as baseline_file:
+        regressions = compare(results, json.load(baseline_file), args.threshold, args.metric)
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+    print(f"\nNo route regressed by more than {args.threshold:g}% ({args.metric}) against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
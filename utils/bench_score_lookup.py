@@ -0,0 +1,79 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, insert, bindparam
+from app.models.database import Score
+
+def populate(engine, rows, users, quizzes, chunk_size=50000):
+    """Fill the score table with unique (user_id, quiz_id) pairs"""
+    table = Score.__table__
+    pairs = random.sample(range(users * quizzes), rows)
+    with engine.begin() as connection:
+        for start in range(0, rows, chunk_size):
+            connection.execute(insert(table), [
+                {
+                    'user_id': pair // quizzes + 1,
+                    'quiz_id': pair % quizzes + 1,
+                    'total_score': random.randint(0, 10),
+                    'max_score': 10
+                } for pair in pairs[start:start + chunk_size]
+            ])
+
+def time_lookups(engine, lookups, users, quizzes):
+    """Return the mean latency in milliseconds of the (user_id, quiz_id) lookup"""
+    table = Score.__table__
+    statement = select(table).where(
+        table.c.user_id == bindparam('user_id'),
+        table.c.quiz_id == bindparam('quiz_id')
+    ).limit(1)
+    keys = [(random.randint(1, users), random.randint(1, quizzes)) for _ in range(lookups)]
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        for user_id, quiz_id in keys:
+            connection.execute(statement, {'user_id': user_id, 'quiz_id': quiz_id}).first()
+        elapsed = time.perf_counter() - started
+    return elapsed / lookups * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Score lookups before and after indexing')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--quizzes', type=int, default=500)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(42)
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(f'sqlite:///{path}')
+    table = Score.__table__
+
+    table.create(engine)
+    for index in table.indexes:
+        index.drop(engine)
+
+    started = time.perf_counter()
+    populate(engine, args.rows, args.users, args.quizzes)
+    print(f"Inserted {args.rows} scores in {time.perf_counter() - started:.1f}s")
+
+    before = time_lookups(engine, args.lookups, args.users, args.quizzes)
+    print(f"Without indexes: {before:.3f} ms per lookup")
+
+    started = time.perf_counter()
+    for index in table.indexes:
+        index.create(engine)
+    print(f"Built indexes in {time.perf_counter() - started:.1f}s")
+
+    after = time_lookups(engine, args.lookups * 50, args.users, args.quizzes)
+    print(f"With indexes:    {after:.3f} ms per lookup ({before / after:.0f}x faster)")
+
+    engine.dispose()
+    os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, or_, text, bindparam
+from app.models.database import Question
+from app.utils.search_index import SEARCH_TABLES, create_search_index, fts5_available, match_expression
+
+WORDS = (
+    'algebra geometry physics chemistry biology history grammar noun verb adjective '
+    'equation triangle velocity molecule cell empire sentence tense angle force energy '
+    'reaction organism revolution clause vector matrix integral atom gene treaty'
+).split()
+
+def random_text(length):
+    return ' '.join(random.choice(WORDS) + str(random.randint(0, 999)) for _ in range(length))
+
+def populate(engine, rows, chunk_size=50000):
+    """Fill the question table with random text"""
+    with engine.begin() as connection:
+        for start in range(0, rows, chunk_size):
+            connection.execute(insert(Question.__table__), [
+                {
+                    'quiz_id': random.randint(1, 10000),
+                    'question_statement': random_text(12),
+                    'option1': random_text(3),
+                    'option2': random_text(3),
+                    'option3': random_text(3),
+                    'option4': random_text(3),
+                    'correct_option': random.randint(1, 4)
+                } for _ in range(min(chunk_size, rows - start))
+            ])
+
+def time_queries(connection, statement, terms, params):
+    """Return the mean latency in milliseconds of statement over terms"""
+    started = time.perf_counter()
+    for term in terms:
+        connection.execute(statement, params(term)).fetchall()
+    return (time.perf_counter() - started) / len(terms) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark question search: LIKE scan vs FTS5 index')
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--searches', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(42)
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(f'sqlite:///{path}')
+    table = Question.__table__
+    table.create(engine)
+
+    started = time.perf_counter()
+    populate(engine, args.rows)
+    print(f"Inserted {args.rows} questions in {time.perf_counter() - started:.1f}s")
+
+    terms = [random.choice(WORDS) + str(random.randint(0, 999)) for _ in range(args.searches)]
+
+    like = select(table.c.id).where(or_(
+        table.c.question_statement.ilike(bindparam('pattern')),
+        table.c.option1.ilike(bindparam('pattern')),
+        table.c.option2.ilike(bindparam('pattern')),
+        table.c.option3.ilike(bindparam('pattern')),
+        table.c.option4.ilike(bindparam('pattern'))
+    )).limit(args.limit)
+    with engine.connect() as connection:
+        like_ms = time_queries(connection, like, terms, lambda term: {'pattern': f'%{term}%'})
+    print(f"LIKE scan:  {like_ms:.2f} ms per search")
+
+    with engine.begin() as connection:
+        if not fts5_available(connection):
+            print("FTS5 is not available in this SQLite build")
+            return
+        started = time.perf_counter()
+        create_search_index(connection, {'question_fts': SEARCH_TABLES['question_fts']})
+        print(f"Built FTS5 index in {time.perf_counter() - started:.1f}s")
+
+    fts = text(
+        'SELECT rowid FROM question_fts WHERE question_fts MATCH :expression '
+        'ORDER BY rank LIMIT :limit'
+    )
+    with engine.connect() as connection:
+        fts_ms = time_queries(connection, fts, terms,
+                              lambda term: {'expression': match_expression(term), 'limit': args.limit})
+    print(f"FTS5 index: {fts_ms:.2f} ms per search ({like_ms / fts_ms:.0f}x faster)")
+
+    engine.dispose()
+    os.remove(path)
+
+if __name__ == "__main__":
+    main()
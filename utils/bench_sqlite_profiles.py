@@ -0,0 +1,125 @@
+import os
+import sys
+import random
+import argparse
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime, time as day_time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, bindparam
+from sqlalchemy.exc import OperationalError
+from app.models.database import db, Subject, Chapter, Quiz, Question, Score
+from app.utils.sqlite_profile import SQLITE_PROFILES, apply_pragmas
+
+def populate(engine, quizzes, questions_per_quiz):
+    """Create the schema and a set of quizzes to read"""
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Subject.__table__), [{'id': 1, 'name': 'Bench', 'description': ''}])
+        connection.execute(insert(Chapter.__table__), [{'id': 1, 'subject_id': 1, 'name': 'Bench', 'description': ''}])
+        connection.execute(insert(Quiz.__table__), [
+            {
+                'id': quiz_id,
+                'chapter_id': 1,
+                'date_of_quiz': datetime(2024, 1, 1),
+                'start_time': day_time(0, 0),
+                'end_time': day_time(23, 59),
+                'time_duration': 30
+            } for quiz_id in range(1, quizzes + 1)
+        ])
+        connection.execute(insert(Question.__table__), [
+            {
+                'quiz_id': quiz_id,
+                'question_statement': f'Question {number} of quiz {quiz_id}',
+                'option1': 'a', 'option2': 'b', 'option3': 'c', 'option4': 'd',
+                'correct_option': random.randint(1, 4)
+            } for quiz_id in range(1, quizzes + 1) for number in range(questions_per_quiz)
+        ])
+
+def run_worker(args):
+    """Mix quiz reads and score writes for a fixed time; returns (reads, writes, lock errors)"""
+    path, pragmas, worker, duration, write_ratio, quizzes = args
+    random.seed(worker)
+    engine = create_engine(f'sqlite:///{path}')
+    apply_pragmas(engine, pragmas)
+
+    quiz = Quiz.__table__
+    question = Question.__table__
+    read_quiz = select(quiz, question).join(question, question.c.quiz_id == quiz.c.id) \
+        .where(quiz.c.id == bindparam('quiz_id'))
+    write_score = insert(Score.__table__)
+
+    reads = writes = errors = 0
+    user_id = (worker + 1) * 10_000_000
+    deadline = time.perf_counter() + duration
+    with engine.connect() as connection:
+        while time.perf_counter() < deadline:
+            try:
+                if random.random() < write_ratio:
+                    user_id += 1
+                    with connection.begin():
+                        connection.execute(write_score, {
+                            'user_id': user_id,
+                            'quiz_id': random.randint(1, quizzes),
+                            'total_score': random.randint(0, 10),
+                            'max_score': 10
+                        })
+                    writes += 1
+                else:
+                    with connection.begin():
+                        connection.execute(read_quiz, {'quiz_id': random.randint(1, quizzes)}).fetchall()
+                    reads += 1
+            except OperationalError as error:
+                if 'locked' not in str(error) and 'busy' not in str(error):
+                    raise
+                errors += 1
+    engine.dispose()
+    return reads, writes, errors
+
+def run_profile(name, pragmas, args):
+    """Benchmark one profile on a fresh database; returns a result row"""
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    engine = create_engine(f'sqlite:///{path}')
+    apply_pragmas(engine, pragmas)
+    populate(engine, args.quizzes, args.questions)
+    engine.dispose()
+
+    jobs = [(path, pragmas, worker, args.duration, args.write_ratio, args.quizzes)
+            for worker in range(args.workers)]
+    with multiprocessing.get_context('spawn').Pool(args.workers) as pool:
+        results = pool.map(run_worker, jobs)
+
+    reads, writes, errors = (sum(column) for column in zip(*results))
+    attempts = reads + writes + errors
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return name, reads / args.duration, writes / args.duration, 100 * errors / attempts if attempts else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent quiz reads and score writes per SQLite profile')
+    parser.add_argument('--profiles', nargs='+', default=sorted(SQLITE_PROFILES), choices=sorted(SQLITE_PROFILES))
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent processes')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per profile')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='Fraction of operations that are score inserts')
+    parser.add_argument('--busy-timeout', type=int, default=None,
+                        help='Override busy_timeout (ms) in every profile; 0 shows lock errors instead of waits')
+    parser.add_argument('--quizzes', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f"{args.workers} workers, {args.duration:g}s per profile, {args.write_ratio:.0%} writes")
+    print(f"{'profile':<10} {'reads/s':>10} {'writes/s':>10} {'lock errors':>12}")
+    for name in args.profiles:
+        pragmas = dict(SQLITE_PROFILES[name])
+        if args.busy_timeout is not None:
+            pragmas['busy_timeout'] = args.busy_timeout
+        name, reads, writes, error_rate = run_profile(name, pragmas, args)
+        print(f"{name:<10} {reads:>10.0f} {writes:>10.0f} {error_rate:>11.2f}%")
+
+if __name__ == "__main__":
+    main()
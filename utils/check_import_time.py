@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter so nothing is imported or cached beforehand
+COLD_START = '''
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+finished = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (finished - imported) * 1000}))
+'''
+
+def parse_importtime(stderr):
+    """
+    Parse the report of python -X importtime.
+
+    Returns:
+        list: (module, cumulative microseconds, nesting depth) per imported module
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(cumulative), depth))
+    return modules
+
+def measure():
+    """Cold-start the app once; returns (timings in ms, imported modules)"""
+    env = dict(os.environ, DATABASE_URL='sqlite://')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', COLD_START],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f'create_app() failed:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fail if importing the app and calling create_app() exceeds a time budget '
+                    'or imports a module that should only load on first use')
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help='Allowed time for the import and create_app() together')
+    parser.add_argument('--forbid', action='append', default=['matplotlib'], metavar='PACKAGE',
+                        help='Package that must not be imported at startup; repeatable')
+    parser.add_argument('--runs', type=int, default=3, help='Cold starts measured; the fastest counts')
+    parser.add_argument('--top', type=int, default=10, help='Slowest packages to list')
+    args = parser.parse_args()
+
+    timings, modules = min((measure() for _ in range(args.runs)),
+                           key=lambda run: run[0]['import_ms'] + run[0]['create_app_ms'])
+    total = timings['import_ms'] + timings['create_app_ms']
+    print(f"import app {timings['import_ms']:.0f} ms, create_app() {timings['create_app_ms']:.0f} ms, "
+          f"total {total:.0f} ms (budget {args.budget_ms:g} ms)")
+
+    # Cumulative times include nested imports, so a package also counts the packages it loads
+    print('\nSlowest packages:')
+    for name, cumulative, _ in sorted((module for module in modules if '.' not in module[0]),
+                                      key=lambda module: -module[1])[:args.top]:
+        print(f'  {cumulative / 1000:>8.1f} ms  {name}')
+
+    failures = []
+    if total > args.budget_ms:
+        failures.append(f'cold start took {total:.0f} ms, over the {args.budget_ms:g} ms budget')
+    imported = {name for name, _, _ in modules}
+    for package in args.forbid:
+        if package in imported:
+            failures.append(f'{package} is imported at startup')
+    if failures:
+        print('\nFAILED:')
+        for failure in failures:
+            print(f'  {failure}')
+        sys.exit(1)
+    print('\nOK')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import os
+import sys
+import time
+import random
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+import http.client
+import multiprocessing
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, init_schema
+from app.models.database import db, User, Chapter, Quiz, Question, Score
+from app.utils.metrics import LATENCY_BUCKETS, format_bound
+from app.utils.submissions import submission_queue
+from utils.setup_test_db import generate_synthetic_db
+
+PHASES = ('login', 'open', 'submit')
+
+def percentile(samples, fraction):
+    """Return the nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def serve(database, workdir, port, processes):
+    """Run the application on the Werkzeug server; the target of the local server process"""
+    from werkzeug.serving import run_simple
+
+    # Everything the server logs, including 'database is locked' tracebacks, goes to server.log
+    log = open(os.path.join(workdir, 'server.log'), 'a', buffering=1)
+    os.dup2(log.fileno(), 2)
+    sys.stderr = log
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    logging.getLogger('app.utils.query_stats').setLevel(logging.ERROR)
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'SUBMISSION_JOURNAL': os.path.join(workdir, 'submissions.journal'),
+        'METRICS_DIR': os.path.join(workdir, 'metrics')
+    })
+    if processes > 1:
+        # Each request runs in a process that exits right after responding;
+        # the server process writes the attempts they journal
+        submission_queue.start()
+    run_simple('127.0.0.1', port, app, threaded=processes == 1, processes=processes)
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(url.hostname, url.port, timeout=1)
+            connection.request('GET', '/login')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f'Server at {url.geturl()} did not start within {timeout}s')
+
+def add_quiz(opens_at, closes_at, questions):
+    """Add a quiz available from opens_at to closes_at (datetimes of today); returns (quiz ID, question IDs)"""
+    quiz = Quiz(chapter_id=Chapter.query.first().id,
+                date_of_quiz=opens_at.replace(hour=0, minute=0, second=0, microsecond=0),
+                start_time=opens_at.time().replace(microsecond=0), end_time=closes_at.time(),
+                time_duration=max(1, round((closes_at - opens_at).total_seconds() / 60)))
+    db.session.add(quiz)
+    db.session.flush()
+    for number in range(questions):
+        db.session.add(Question(quiz_id=quiz.id, question_statement=f'Load test question {number}',
+                                option1='a', option2='b', option3='c', option4='d', correct_option=1))
+    db.session.commit()
+    return quiz.id, [question.id for question in quiz.questions]
+
+class Student:
+    """One simulated user: an HTTP connection and the session cookie it was given"""
+    def __init__(self, url):
+        self.connection = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        """Send one request without following redirects; returns (status, Location header)"""
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            # The development server closes the connection after each response
+            self.connection.close()
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, response.getheader('Location') or ''
+
+def run_student(url, username, schedule, quiz_id, answers, records):
+    """Log in, open the quiz when it starts and submit before it ends, recording every request"""
+    student = Student(url)
+    steps = (
+        ('login', 'POST', '/login', {'username': username, 'password': 'password', 'user_type': 'user'},
+         lambda status, location: status == 302 and '/user/dashboard' in location),
+        ('open', 'GET', f'/user/quiz/{quiz_id}/attempt', None,
+         lambda status, location: status == 200),
+        ('submit', 'POST', f'/user/quiz/{quiz_id}/attempt', answers,
+         lambda status, location: status == 302 and '/result' in location)
+    )
+    for (phase, method, path, form, succeeded), at in zip(steps, schedule):
+        time.sleep(max(0.0, at - time.time()))
+        started = time.perf_counter()
+        try:
+            status, location = student.request(method, path, form)
+            outcome = 'ok' if succeeded(status, location) else f'HTTP {status} {urlsplit(location).path}'.strip()
+        except Exception as error:
+            outcome = type(error).__name__
+        records.append((phase, time.time(), (time.perf_counter() - started) * 1000, outcome))
+        if outcome != 'ok':
+            return
+
+def run_students(url, students, quiz_id, answers):
+    """Run a group of students on threads in one process; returns their request records"""
+    url = urlsplit(url)
+    records = []
+    threads = [threading.Thread(target=run_student, args=(url, username, schedule, quiz_id, answers, records))
+               for username, schedule in students]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+def scrape(url):
+    """Return the samples of the server's /metrics endpoint as {sample key: value}"""
+    url = urlsplit(url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    connection.request('GET', '/metrics')
+    response = connection.getresponse()
+    if response.status != 200:
+        return {}
+    samples = {}
+    for line in response.read().decode('utf-8').splitlines():
+        if line and not line.startswith('#'):
+            key, _, value = line.rpartition(' ')
+            samples[key] = float(value)
+    return samples
+
+def histogram_quantile(samples, name, fraction):
+    """Upper bound of the bucket holding the given quantile of an unlabelled histogram"""
+    count = samples.get(f'{name}_count', 0)
+    for bound in (*LATENCY_BUCKETS, float('inf')):
+        if samples.get(f'{name}_bucket{{le="{format_bound(bound)}"}}', 0) >= fraction * count:
+            return bound
+    return float('inf')
+
+def delta(after, before):
+    return {key: value - before.get(key, 0.0) for key, value in after.items()}
+
+def report(records, started, users):
+    print(f"\n{'phase':<8} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for phase in PHASES:
+        phase_records = [record for record in records if record[0] == phase]
+        if not phase_records:
+            continue
+        latencies = [latency for _, _, latency, _ in phase_records]
+        errors = sum(1 for *_, outcome in phase_records if outcome != 'ok')
+        # Throughput over the burst: from the first request sent to the last response received
+        window = max(finished for _, finished, _, _ in phase_records) - \
+            min(finished - latency / 1000 for _, finished, latency, _ in phase_records)
+        print(f"{phase:<8} {len(phase_records):>8} {errors:>7} {len(phase_records) / max(window, 1e-6):>8.1f} "
+              f"{percentile(latencies, 0.50):>9.1f} {percentile(latencies, 0.95):>9.1f} "
+              f"{percentile(latencies, 0.99):>9.1f} {max(latencies):>9.1f}")
+
+    failures = Counter((phase, outcome) for phase, _, _, outcome in records if outcome != 'ok')
+    if failures:
+        print('\nFailures:')
+        for (phase, outcome), count in failures.most_common():
+            print(f'  {phase:<8} {outcome:<40} {count:>6}')
+    error_rate = sum(failures.values()) / max(len(records), 1)
+    print(f"\n{users} users, {len(records)} requests in {time.time() - started:.1f}s, "
+          f"error rate {error_rate:.2%}")
+
+def report_database(samples, persist_lag, lock_errors):
+    name = 'quizmaster_submission_write_seconds'
+    batches = samples.get(f'{name}_count', 0)
+    print('\nDatabase writes:')
+    if batches:
+        print(f"  submission batches {batches:.0f}, {samples.get('quizmaster_submissions_written_total', 0):.0f} rows, "
+              f"mean {samples[f'{name}_sum'] / batches * 1000:.1f} ms, "
+              f"p95 <= {histogram_quantile(samples, name, 0.95) * 1000:g} ms")
+        print(f"  failed batch writes {samples.get('quizmaster_submission_write_errors_total', 0):.0f}")
+        queries = samples.get('quizmaster_db_queries_total{endpoint="user.attempt_quiz"}', 0)
+        if queries:
+            seconds = samples.get('quizmaster_db_seconds_total{endpoint="user.attempt_quiz"}', 0)
+            print(f"  attempt_quiz SQL: {queries:.0f} statements, {seconds / queries * 1000:.2f} ms each")
+    else:
+        print('  no /metrics data (is METRICS_ENABLED off?)')
+    if persist_lag is None:
+        print('  accepted submissions were not all stored within the timeout')
+    else:
+        print(f"  last submission stored {persist_lag * 1000:.0f} ms after the last response")
+    if lock_errors is not None:
+        print(f"  'database is locked' errors in the server log: {lock_errors}")
+
+def wait_for_scores(app, quiz_id, expected, timeout=60):
+    """Seconds until expected scores of the quiz are in the database, or None after timeout"""
+    started = time.time()
+    while time.time() - started < timeout:
+        with app.app_context():
+            stored = db.session.query(Score).filter_by(quiz_id=quiz_id).count()
+            db.session.remove()
+        if stored >= expected:
+            return time.time() - started
+        time.sleep(0.05)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Simulate a class logging in, opening a quiz the moment it starts '
+                    'and submitting just before it ends')
+    parser.add_argument('--users', type=int, default=200, help='Simulated students')
+    parser.add_argument('--ramp', type=float, default=10, help='Seconds over which the students log in')
+    parser.add_argument('--duration', type=float, default=20,
+                        help='Seconds from the quiz start to the end of the submission window')
+    parser.add_argument('--think', type=float, default=5,
+                        help='Submissions are spread over this many seconds before the end')
+    parser.add_argument('--open-spread', type=float, default=0,
+                        help='Spread the quiz opening over this many seconds instead of all at once')
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='Client processes; each runs one thread per student')
+    parser.add_argument('--database', help='SQLite database to use; a generated one by default. '
+                                           'A quiz is added to it and needs users user<N> with password "password"')
+    parser.add_argument('--url', help='Load an already running server (e.g. gunicorn -w 4 app:app) that uses '
+                                      '--database, instead of starting one')
+    parser.add_argument('--server-processes', type=int, default=1,
+                        help='Worker processes of the local server; 1 runs a threaded server')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database = os.path.abspath(args.database or os.path.join(workdir, 'load.db'))
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'SUBMISSION_JOURNAL': os.path.join(workdir, 'harness.journal'),
+        'METRICS_ENABLED': False
+    })
+    init_schema(app)
+    with app.app_context():
+        if not args.database:
+            generate_synthetic_db(args.users, 2, 2, 2, args.questions, 0.0)
+        usernames = [username for (username,) in db.session.query(User.username)
+                     .filter(User.username.like('user%')).order_by(User.id).limit(args.users)]
+        if len(usernames) < args.users:
+            raise SystemExit(f'Only {len(usernames)} users in {database}; generate more with utils/setup_test_db.py')
+
+        db.engine.dispose()
+
+    server = None
+    if args.url is None:
+        port = free_port()
+        args.url = f'http://127.0.0.1:{port}'
+        server = multiprocessing.get_context('spawn').Process(
+            target=serve, args=(database, workdir, port, args.server_processes), daemon=True)
+        server.start()
+        wait_until_ready(urlsplit(args.url))
+
+    # Students log in during the ramp; the quiz starts right after it
+    begins = time.time() + 2
+    opens = begins + args.ramp + 1
+    closes = opens + args.duration
+    with app.app_context():
+        quiz_id, question_ids = add_quiz(datetime.fromtimestamp(opens), datetime.fromtimestamp(closes + 5),
+                                         args.questions)
+        db.engine.dispose()
+    print(f'Loading {args.url}: {args.users} users, quiz {quiz_id} opens in {opens - time.time():.0f}s')
+
+    students = [
+        (username, (begins + args.ramp * number / args.users,
+                    opens + random.uniform(0, args.open_spread),
+                    closes - random.uniform(0, args.think)))
+        for number, username in enumerate(usernames)
+    ]
+    answers = {f'question_{question_id}': str(random.randint(1, 4)) for question_id in question_ids}
+    groups = [students[index::args.processes] for index in range(args.processes)]
+
+    before = scrape(args.url)
+    started = time.time()
+    with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+        records = [record for group in pool.starmap(
+            run_students, [(args.url, group, quiz_id, answers) for group in groups if group]) for record in group]
+
+    accepted = sum(1 for phase, *_, outcome in records if phase == 'submit' and outcome == 'ok')
+    persist_lag = wait_for_scores(app, quiz_id, accepted)
+    samples = delta(scrape(args.url), before)
+    report(records, started, args.users)
+
+    lock_errors = None
+    if server is not None:
+        server.terminate()
+        server.join()
+        with open(os.path.join(workdir, 'server.log'), errors='replace') as log:
+            lock_errors = log.read().count('database is locked')
+    report_database(samples, persist_lag, lock_errors)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app import create_app, init_schema
+from app.models.database import db
+
+# Rows removed by remove_duplicate_scores() are copied here first
+BACKUP_TABLE = 'score_duplicates_backup'
+
+DUPLICATE_SCORES = 'FROM score WHERE id NOT IN (SELECT MIN(id) FROM score GROUP BY user_id, quiz_id)'
+
+def find_duplicate_scores(connection):
+    """
+    Return the score rows remove_duplicate_scores() would delete.
+
+    Returns:
+        list: (id, user_id, quiz_id, total_score, max_score) rows, by id
+    """
+    return connection.execute(text(
+        f'SELECT id, user_id, quiz_id, total_score, max_score {DUPLICATE_SCORES} ORDER BY id'
+    )).all()
+
+def remove_duplicate_scores(connection):
+    """
+    Delete duplicate (user_id, quiz_id) score rows, keeping the first attempt.
+
+    Older databases could hold several attempts per quiz (e.g. via POST /api/scores),
+    which would make the unique score index impossible to build. The deleted
+    rows are copied to BACKUP_TABLE first, in the same transaction.
+
+    Returns:
+        int: Number of rows removed
+    """
+    if not inspect(connection).has_table(BACKUP_TABLE):
+        connection.execute(text(f'CREATE TABLE {BACKUP_TABLE} AS SELECT * FROM score WHERE 1 = 0'))
+    connection.execute(text(f'INSERT INTO {BACKUP_TABLE} SELECT * {DUPLICATE_SCORES}'))
+    result = connection.execute(text(f'DELETE {DUPLICATE_SCORES}'))
+    return result.rowcount
+
+def find_missing_indexes(connection):
+    """Return the names of declared indexes that ensure_indexes() would create"""
+    inspector = inspect(connection)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)} \
+            if inspector.has_table(table.name) else set()
+        missing.extend(index.name for index in table.indexes if index.name not in existing)
+    return missing
+
+def ensure_indexes(connection):
+    """
+    Create every index declared on the models that does not exist yet.
+
+    db.create_all() only creates indexes together with new tables, so databases
+    created before the indexes were declared need this step.
+
+    Returns:
+        list: Names of all declared indexes
+    """
+    names = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+            names.append(index.name)
+    return names
+
+def report_dry_run(app):
+    """Print what migrate_db() would change, without changing anything"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            duplicates = find_duplicate_scores(connection) if inspect(connection).has_table('score') else []
+            missing = find_missing_indexes(connection)
+
+    print(f"{len(duplicates)} duplicate score(s) would be moved to {BACKUP_TABLE} and deleted")
+    if duplicates:
+        print(f"{'id':>10} {'user_id':>10} {'quiz_id':>10} {'score':>10}")
+        for score_id, user_id, quiz_id, total_score, max_score in duplicates:
+            print(f"{score_id:>10} {user_id:>10} {quiz_id:>10} {f'{total_score}/{max_score}':>10}")
+    print(f"Indexes to create: {', '.join(missing) or 'none'}")
+
+def migrate_db(dry_run=False):
+    """
+    Bring an existing quiz_master.db up to date with the current models.
+
+    Args:
+        dry_run (bool): Only list the score rows that would be deleted and the
+            indexes that would be created
+    """
+    app = create_app()
+    if dry_run:
+        report_dry_run(app)
+        return
+
+    init_schema(app)
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            removed = remove_duplicate_scores(connection)
+            indexes = ensure_indexes(connection)
+            connection.execute(text('ANALYZE'))
+
+        print(f"Removed {removed} duplicate score(s); copies are kept in {BACKUP_TABLE}")
+        print(f"Indexes in place: {', '.join(indexes)}")
+        print("Database migration complete!")
+
+def main():
+    parser = argparse.ArgumentParser(description='Bring an existing database up to date with the current models')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='List the duplicate scores that would be deleted and the missing indexes, '
+                             'and change nothing')
+    args = parser.parse_args()
+    migrate_db(dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    main()
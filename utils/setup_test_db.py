@@ -1,23 +1,30 @@
 import os
 import sys
+import random
+import argparse
+import time as clock
+from contextlib import contextmanager
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import create_app
+from sqlalchemy import func, insert
+from app import create_app, init_schema
 from app.models.database import db, Admin, User, Subject, Chapter, Quiz, Question, Score
+from app.utils.search_index import fts_enabled, create_search_index, drop_search_triggers, rebuild_search_index
 from datetime import datetime, time, timedelta
 from werkzeug.security import generate_password_hash
 
-def setup_test_db():
+def setup_test_db(database=None):
     """
     Set up a new database with test data including quizzes with different time settings
+
+    Args:
+        database (str, optional): Database URL; defaults to the app's configured database
     """
-    app = create_app()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database} if database else None)
+    init_schema(app)
     
     with app.app_context():
-        # Create tables
-        db.create_all()
-        
         # Check if admin exists
         admin = Admin.query.filter_by(username="admin").first()
         if not admin:
@@ -818,5 +825,232 @@ def setup_test_db():
         print("User - Username: testuser, Password: password")
         print("User2 - Username: testuser2, Password: password")
 
+WORDS = (
+    'algebra geometry physics chemistry biology history grammar noun verb adjective '
+    'equation triangle velocity molecule cell empire sentence tense angle force energy '
+    'reaction organism revolution clause vector matrix integral atom gene treaty'
+).split()
+
+def next_id(model):
+    """First free primary key of a model's table, so generated rows can reference each other"""
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+def insert_chunks(model, rows, chunk_size):
+    """
+    Insert rows with executemany, committing every chunk_size rows.
+
+    Args:
+        model: Model whose table receives the rows
+        rows (iterable): Row dicts, consumed lazily
+        chunk_size (int): Rows per INSERT and transaction
+
+    Returns:
+        int: Number of rows inserted
+    """
+    table = model.__table__
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            with db.engine.begin() as connection:
+                connection.execute(insert(table), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        with db.engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+        count += len(chunk)
+    return count
+
+@contextmanager
+def deferred_indexes():
+    """
+    Drop the secondary indexes and full-text sync triggers for a bulk load.
+
+    Afterwards every index is built once from the loaded rows, which is far
+    cheaper than updating it row by row, and the full-text index is rebuilt.
+    Unique constraints declared on columns stay in place.
+    """
+    indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+    search = fts_enabled()
+    with db.engine.begin() as connection:
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+        if search:
+            drop_search_triggers(connection)
+    try:
+        yield
+    finally:
+        started = clock.perf_counter()
+        with db.engine.begin() as connection:
+            for index in indexes:
+                index.create(connection, checkfirst=True)
+            if search:
+                create_search_index(connection)
+                rebuild_search_index(connection)
+        print(f"Rebuilt indexes in {clock.perf_counter() - started:.1f}s")
+
+def generate_synthetic_db(users, subjects, chapters_per_subject, quizzes_per_chapter,
+                          questions_per_quiz, attempt_rate, seed=42, chunk_size=50000):
+    """
+    Add a large synthetic data set to the database with bulk inserts.
+
+    Each user is enrolled in one subject and attempts each of its past quizzes
+    with probability attempt_rate. The same seed always produces the same
+    data. IDs continue after the existing rows, so the data can be added to a
+    database that already holds the fixture data of setup_test_db().
+
+    Args:
+        users (int): Number of users
+        subjects (int): Number of subjects
+        chapters_per_subject (int): Chapters in each subject
+        quizzes_per_chapter (int): Quizzes in each chapter, spread over the last
+            180 days and the next 30 days
+        questions_per_quiz (int): Questions in each quiz
+        attempt_rate (float): Probability that a user attempted a past quiz of their subject
+        seed (int): Random seed
+        chunk_size (int): Rows per INSERT and transaction
+    """
+    rng = random.Random(seed)
+    # Hashing is deliberately slow; every generated account shares one hash
+    password = generate_password_hash('password')
+    now = datetime.now()
+    today = datetime.combine(now.date(), time())
+
+    user_id = next_id(User)
+    subject_id = next_id(Subject)
+    chapter_id = next_id(Chapter)
+    quiz_id = next_id(Quiz)
+
+    if not Admin.query.filter_by(username='admin').first():
+        db.session.add(Admin(username='admin', email='admin@example.com', password=password))
+        db.session.commit()
+
+    # Random text is drawn from pools built once, as generating it per row dominated the run time
+    phrases = [' '.join(rng.choices(WORDS, k=2)) for _ in range(5000)]
+    sentences = [' '.join(rng.choices(WORDS, k=12)) + '?' for _ in range(20000)]
+    descriptions = [' '.join(rng.choices(WORDS, k=8)) for _ in range(1000)]
+
+    started = clock.perf_counter()
+    total_rows = 0
+    def timed(name, model, rows):
+        nonlocal total_rows
+        table_started = clock.perf_counter()
+        count = insert_chunks(model, rows, chunk_size)
+        total_rows += count
+        print(f"{name:<10} {count:>10} rows in {clock.perf_counter() - table_started:6.1f}s", flush=True)
+
+    with deferred_indexes():
+        timed('users', User, (
+            {
+                'id': user_id + n,
+                'username': f'user{user_id + n}',
+                'email': f'user{user_id + n}@example.com',
+                'password': password,
+                'full_name': rng.choice(phrases).title(),
+                'qualification': rng.choice(('Student', 'Graduate', 'Postgraduate')),
+                'dob': datetime(1990, 1, 1) + timedelta(days=rng.randrange(365 * 20))
+            } for n in range(users)
+        ))
+        timed('subjects', Subject, (
+            {'id': subject_id + n, 'name': f'Subject {subject_id + n}', 'description': rng.choice(descriptions)}
+            for n in range(subjects)
+        ))
+        timed('chapters', Chapter, (
+            {
+                'id': chapter_id + n,
+                'subject_id': subject_id + n // chapters_per_subject,
+                'name': f'{rng.choice(phrases).title()} {chapter_id + n}',
+                'description': rng.choice(descriptions)
+            } for n in range(subjects * chapters_per_subject)
+        ))
+
+        quiz_count = subjects * chapters_per_subject * quizzes_per_chapter
+        quiz_days = [rng.randint(-180, 30) for _ in range(quiz_count)]
+        def quiz_rows():
+            for n in range(quiz_count):
+                start_hour = rng.randint(0, 20)
+                yield {
+                    'id': quiz_id + n,
+                    'chapter_id': chapter_id + n // quizzes_per_chapter,
+                    'date_of_quiz': today + timedelta(days=quiz_days[n]),
+                    'start_time': time(start_hour, 0),
+                    'end_time': time(start_hour + 3, 0),
+                    'time_duration': rng.choice((15, 30, 45, 60))
+                }
+        timed('quizzes', Quiz, quiz_rows())
+
+        timed('questions', Question, (
+            {
+                'quiz_id': quiz_id + n // questions_per_quiz,
+                'question_statement': rng.choice(sentences),
+                'option1': rng.choice(phrases),
+                'option2': rng.choice(phrases),
+                'option3': rng.choice(phrases),
+                'option4': rng.choice(phrases),
+                'correct_option': rng.randint(1, 4)
+            } for n in range(quiz_count * questions_per_quiz)
+        ))
+
+        # Quizzes already held, by subject
+        quizzes_per_subject = chapters_per_subject * quizzes_per_chapter
+        past_quizzes = [[] for _ in range(subjects)]
+        for n, day in enumerate(quiz_days):
+            if day < 0:
+                past_quizzes[n // quizzes_per_subject].append(quiz_id + n)
+
+        # Higher scores are more likely: weight k + 1 for a score of k, as cumulative weights
+        possible_scores = range(questions_per_quiz + 1)
+        score_weights = [(k + 1) * (k + 2) // 2 for k in possible_scores]
+
+        def score_rows():
+            for n in range(users):
+                candidates = past_quizzes[rng.randrange(subjects)]
+                # Normal approximation of Binomial(len(candidates), attempt_rate)
+                mean = len(candidates) * attempt_rate
+                spread = (mean * (1 - attempt_rate)) ** 0.5
+                attempts = min(len(candidates), max(0, round(rng.gauss(mean, spread))))
+                totals = rng.choices(possible_scores, cum_weights=score_weights, k=attempts)
+                for attempted, total in zip(rng.sample(candidates, attempts), totals):
+                    yield {
+                        'user_id': user_id + n,
+                        'quiz_id': attempted,
+                        'total_score': total,
+                        'max_score': questions_per_quiz
+                    }
+        timed('scores', Score, score_rows())
+
+    print(f"{'total':<10} {total_rows:>10} rows in {clock.perf_counter() - started:6.1f}s")
+    print("All generated users log in with password 'password'")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Create the test database. Without options, adds the small fixture data set; '
+                    'with --users, generates a large synthetic one.')
+    parser.add_argument('--users', type=int, help='Generate synthetic data with this many users')
+    parser.add_argument('--subjects', type=int, default=50)
+    parser.add_argument('--chapters-per-subject', type=int, default=20)
+    parser.add_argument('--quizzes-per-chapter', type=int, default=30)
+    parser.add_argument('--questions-per-quiz', type=int, default=40)
+    parser.add_argument('--attempt-rate', type=float, default=0.3,
+                        help='Probability that a user attempted each past quiz of their subject')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per INSERT and transaction')
+    parser.add_argument('--database', help='Database URL; defaults to DATABASE_URL or sqlite:///quiz_master.db')
+    args = parser.parse_args()
+
+    if args.users is None:
+        setup_test_db(args.database)
+        return
+
+    config = {'SQLALCHEMY_DATABASE_URI': args.database} if args.database else None
+    app = create_app(config)
+    init_schema(app)
+    with app.app_context():
+        generate_synthetic_db(args.users, args.subjects, args.chapters_per_subject,
+                              args.quizzes_per_chapter, args.questions_per_quiz,
+                              args.attempt_rate, args.seed, args.chunk_size)
+
 if __name__ == "__main__":
-    setup_test_db() 
\ No newline at end of file
+    main() 
\ No newline at end of file